@@ -14,6 +14,7 @@ interface Summary {
   summary: string;
   id: string;
   title: string;
+  duplicate_of?: string;
 }
 
 interface Summaries {
@@ -28,6 +29,32 @@ interface Summaries {
   };
 }
 
+interface SummaryEvent {
+  type: 'summary';
+  summary: Summary;
+}
+
+interface SummaryDelta {
+  type: 'summary_delta';
+  id: string;
+  delta: string;
+}
+
+interface Preview {
+  id: string;
+  title: string;
+  url: string;
+  preview: string;
+  kind: 'abstract' | 'summary';
+  authors: string[];
+  categories: string[];
+}
+
+interface PreviewEvent {
+  type: 'preview';
+  preview: Preview;
+}
+
 interface Message {
   type: 'message';
   message: string;
@@ -37,11 +64,38 @@ interface Message {
   };
 }
 
-type StreamResponse = Title | Summaries | Message;
+type StreamResponse = Title | Summaries | SummaryEvent | SummaryDelta | PreviewEvent | Message;
+
+// Calls onEvent for every NDJSON event in a streamed response
+async function readEvents(response: Response, onEvent: (data: any) => void) {
+  const reader = response.body?.getReader();
+  if (!reader) throw new Error("No reader available");
+
+  // A chunk can end mid-line, so keep the partial line until the next read
+  const decoder = new TextDecoder();
+  let buffered = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split("\n");
+    buffered = lines.pop() ?? "";
+
+    for (const line of lines.filter(Boolean)) {
+      onEvent(JSON.parse(line));
+    }
+  }
+}
 
 export function PaperScout() {
-  const [papers, setPapers] = useState<Array<{ title: string; url: string }>>([]);
+  const [papers, setPapers] = useState<Array<{ id: string; title: string; url: string }>>([]);
   const [summaries, setSummaries] = useState<Array<{ summary: string; id: string; title: string }>>([]);
+  const [previews, setPreviews] = useState<Preview[]>([]);
+  const [expanding, setExpanding] = useState<Record<string, boolean>>({});
+  // Summaries that are still being written, by paper id
+  const [drafts, setDrafts] = useState<Record<string, string>>({});
   const [currentStatus, setCurrentStatus] = useState<string>("");
   const [currentLatency, setCurrentLatency] = useState<number>(0);
   const [isLoading, setIsLoading] = useState(false);
@@ -59,6 +113,9 @@ export function PaperScout() {
     setError("");
     setPapers([]);
     setSummaries([]);
+    setPreviews([]);
+    setExpanding({});
+    setDrafts({});
     setCurrentStatus("");
     setCurrentLatency(0);
     setCurrentTool("");
@@ -73,45 +130,49 @@ export function PaperScout() {
       const response = await fetch("http://localhost:8000/stream", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: query, max_results: maxResults }),
+        // Previews arrive straight away; full summaries are only generated for papers the user expands
+        body: JSON.stringify({ message: query, max_results: maxResults, detail: "preview" }),
       });
 
+      if (response.status === 429 || response.status === 503) {
+        throw new Error(`PaperScout is busy, please try again in ${response.headers.get("Retry-After") ?? "a few"} seconds`);
+      }
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const reader = response.body?.getReader();
-      if (!reader) throw new Error("No reader available");
-
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        const text = new TextDecoder().decode(value);
-        const lines = text.split("\n").filter(Boolean);
-
-        for (const line of lines) {
-          const data = JSON.parse(line);
-          
-          switch (data.type) {
-            case "status":
-              setCurrentStatus(data.status);
-              setCurrentLatency(data.latency);
-              break;
-            case "titles":
-              setPapers(data.papers);
-              break;
-            case "summaries":
-              setSummaries(data.summaries);
-              setCurrentStatus("");
-              setCurrentLatency(0);
-              break;
-            case "message":
-              setError(data.message);
-              break;
-          }
+      await readEvents(response, (data) => {
+        switch (data.type) {
+          case "status":
+            setCurrentStatus(data.status);
+            setCurrentLatency(data.latency);
+            break;
+          case "titles":
+            setPapers(data.papers);
+            break;
+          case "summaries":
+            setSummaries(data.summaries);
+            setCurrentStatus("");
+            setCurrentLatency(0);
+            break;
+          case "summary_delta":
+            appendDraft(data.id, data.delta);
+            break;
+          case "summary":
+            finishSummary(data.summary);
+            break;
+          case "preview":
+            setPreviews(prev => [...prev, data.preview]);
+            break;
+          case "message":
+            setError(data.message);
+            break;
+          case "error":
+            setError(data.message);
+            break;
         }
-      }
+      });
+      setCurrentStatus("");
     } catch (err) {
       setError(err instanceof Error ? err.message : "An error occurred");
     } finally {
@@ -119,6 +180,48 @@ export function PaperScout() {
     }
   };
 
+  const expandPreview = async (id: string) => {
+    setExpanding(prev => ({ ...prev, [id]: true }));
+    try {
+      const response = await fetch(`http://localhost:8000/papers/${encodeURIComponent(id)}/summary?stream=true`, { method: "POST" });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      await readEvents(response, (data) => {
+        switch (data.type) {
+          case "summary_delta":
+            appendDraft(data.id, data.delta);
+            break;
+          case "summary":
+            finishSummary(data.summary);
+            break;
+          case "error":
+            setError(data.message);
+            break;
+        }
+      });
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "An error occurred");
+    } finally {
+      setExpanding(prev => ({ ...prev, [id]: false }));
+    }
+  };
+
+  const appendDraft = (id: string, delta: string) => {
+    setDrafts(prev => ({ ...prev, [id]: (prev[id] ?? "") + delta }));
+  };
+
+  // The finished summary replaces its draft
+  const finishSummary = (summary: Summary) => {
+    setSummaries(prev => [...prev, summary]);
+    setDrafts(prev => {
+      const { [summary.id]: _, ...rest } = prev;
+      return rest;
+    });
+  };
+
+  const summaryFor = (id: string) => summaries.find(summary => summary.id === id);
+
   return (
     <Container size="md" py="xl" style={{ minHeight: '100vh', display: 'flex', flexDirection: 'column', alignItems: 'center' }}>
       <Paper shadow="sm" p="xl" radius="md" withBorder style={{ flex: 1, display: 'flex', flexDirection: 'column', width: '100%', maxWidth: '800px' }}>
@@ -191,17 +294,64 @@ export function PaperScout() {
             </Stack>
           )}
 
-          {summaries.length > 0 && (
+          {previews.length > 0 && (
+            <Stack gap="xs">
+              <Title order={3} size="h4" style={{ color: '#000000' }}>Previews</Title>
+              {previews.map((preview) => {
+                const summary = summaryFor(preview.id);
+                return (
+                  <Paper key={preview.id} p="md" withBorder>
+                    <Title order={4} size="h5" style={{ color: '#000000' }} mb="xs">{preview.title}</Title>
+                    {preview.authors.length > 0 && (
+                      <Text size="xs" style={{ color: '#666666' }} mb="xs">{preview.authors.join(", ")}</Text>
+                    )}
+                    <Group gap="xs" mb="xs">
+                      {preview.categories.map(category => <Badge key={category} size="xs" variant="light">{category}</Badge>)}
+                    </Group>
+                    {summary?.duplicate_of && (
+                      <Text size="xs" style={{ color: '#666666' }} mb="xs">Same paper as {summary.duplicate_of}</Text>
+                    )}
+                    <div style={{ color: '#000000' }}>
+                      {summary ? <ReactMarkdown>{summary.summary}</ReactMarkdown>
+                        : drafts[preview.id] ? <ReactMarkdown>{drafts[preview.id]}</ReactMarkdown>
+                        : <Text size="sm">{preview.preview}</Text>}
+                    </div>
+                    {!summary && drafts[preview.id] === undefined && (
+                      <Button variant="light" size="xs" mt="sm" loading={expanding[preview.id]} onClick={() => expandPreview(preview.id)}>
+                        Full summary
+                      </Button>
+                    )}
+                  </Paper>
+                );
+              })}
+            </Stack>
+          )}
+
+          {(summaries.some(summary => !previews.some(preview => preview.id === summary.id))
+            || Object.keys(drafts).some(id => !previews.some(preview => preview.id === id))) && (
             <Stack gap="xs">
               <Title order={3} size="h4" style={{ color: '#000000' }}>Summaries</Title>
-              {summaries.map((summary, index) => (
+              {summaries.filter(summary => !previews.some(preview => preview.id === summary.id)).map((summary, index) => (
                 <Paper key={summary.id} p="md" withBorder>
                   <Title order={4} size="h5" style={{ color: '#000000' }} mb="xs">{summary.title}</Title>
+                  {summary.duplicate_of && (
+                    <Text size="xs" style={{ color: '#666666' }} mb="xs">Same paper as {summary.duplicate_of}</Text>
+                  )}
                   <div style={{ color: '#000000' }}>
                     <ReactMarkdown>{summary.summary}</ReactMarkdown>
                   </div>
                 </Paper>
               ))}
+              {Object.entries(drafts).filter(([id]) => !previews.some(preview => preview.id === id)).map(([id, draft]) => (
+                <Paper key={id} p="md" withBorder>
+                  <Title order={4} size="h5" style={{ color: '#000000' }} mb="xs">
+                    {papers.find(paper => paper.id === id)?.title ?? id} <Loader size="xs" />
+                  </Title>
+                  <div style={{ color: '#000000' }}>
+                    <ReactMarkdown>{draft}</ReactMarkdown>
+                  </div>
+                </Paper>
+              ))}
             </Stack>
           )}
 
@@ -0,0 +1,119 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from metrics import registry
+
+admission_rejected = registry.counter("scout_admission_rejected_total", "Requests turned away by admission control", ["reason"])
+admission_wait_seconds = registry.histogram("scout_admission_wait_seconds", "Time admitted requests waited for a slot")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code, retry_after, reason):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounds how many streaming requests run at once and how many may wait for a turn.
+
+    Requests beyond ``max_in_flight`` wait in a FIFO queue of at most
+    ``max_queue`` entries for up to ``queue_timeout`` seconds. A full queue is
+    rejected straight away with 429 and a timed-out wait with 503, both with a
+    Retry-After estimated from recent request durations. Under load,
+    ``cap_results`` lowers how many papers a request may process.
+    """
+
+    def __init__(self, max_in_flight=None, max_queue=None, queue_timeout=None, max_results=None, min_results=None):
+        self.max_in_flight = max_in_flight or int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 16))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+        self.queue_timeout = queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+        self.max_results = max_results or int(os.getenv("ADMISSION_MAX_RESULTS", 10))
+        self.min_results = min_results or int(os.getenv("ADMISSION_MIN_RESULTS", 1))
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Moving average of how long a request holds its slot, for Retry-After
+        self.mean_duration = 10.0
+        self._waiters = deque()
+
+        registry.gauge("scout_admission_in_flight", "Streaming requests currently running", function=lambda: {(): self.in_flight})
+        registry.gauge("scout_admission_queue_depth", "Streaming requests waiting for a slot", function=lambda: {(): self.queued})
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def retry_after(self):
+        # Time for the requests ahead of a newcomer to drain through the available slots
+        return max(1, math.ceil(self.mean_duration * (self.queued + 1) / self.max_in_flight))
+
+    def _reject(self, status_code, reason):
+        self.rejected += 1
+        admission_rejected.inc(reason=reason)
+        raise AdmissionRejected(status_code, self.retry_after(), reason)
+
+    async def acquire(self):
+        """Wait for a slot, or raise AdmissionRejected when saturated. Returns the time the slot was granted."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            admission_wait_seconds.observe(0.0)
+            return time.monotonic()
+        if self.queued >= self.max_queue:
+            self._reject(429, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up; pass the slot on
+                self.release(None)
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(503, "queue_timeout")
+        self.admitted += 1
+        admission_wait_seconds.observe(time.monotonic() - queued_at)
+        return time.monotonic()
+
+    def release(self, granted_at):
+        if granted_at is not None:
+            self.mean_duration = 0.9 * self.mean_duration + 0.1 * (time.monotonic() - granted_at)
+        # Hand the slot straight to the next waiter so newcomers can't jump the queue
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def cap_results(self, requested):
+        """How many papers an admitted request may process given the load from everything else."""
+        load = max(0, self.in_flight - 1 + self.queued) / self.max_in_flight
+        cap = self.max_results
+        if load > 0.5:
+            # Shrink linearly from the full cap at half load to the minimum at full load
+            cap = round(self.max_results - (self.max_results - self.min_results) * min(1.0, (load - 0.5) * 2))
+        return max(self.min_results, min(requested, cap))
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "mean_duration": round(self.mean_duration, 3),
+            "retry_after": self.retry_after(),
+            "max_results_cap": self.cap_results(self.max_results),
+        }
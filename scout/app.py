@@ -1,17 +1,27 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import AsyncGenerator, Dict
-from pydantic import BaseModel
+from typing import AsyncGenerator, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
 import asyncio
 import json
+import os
 import time
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
+from uuid import uuid4
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from model import get_llm_response
+from metrics import registry, requests_total, span, start_trace
+from admission import AdmissionController, AdmissionRejected
+from delta_buffer import DeltaBuffer
+from jobs import JobManager
+from llm_scheduler import current_flow
+from model import get_llm_response, mcp_client, llm_scheduler
+from router import Router
 from scraper import PaperScraper
 from summariser import Summariser
+from ttl_cache import TTLCache
 
 # Configure logging with timestamps and detailed format
 logger = logging.getLogger(__name__)
@@ -33,7 +43,52 @@ file_handler.setFormatter(file_formatter)
 logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 
-app = FastAPI()
+scraper = PaperScraper()
+summariser = Summariser()
+jobs = JobManager(scraper, summariser)
+# Bounds concurrent streams so a burst queues or is turned away instead of exhausting the box
+admission = AdmissionController()
+# Obvious searches skip the LLM routing call
+query_router = Router(get_llm_response)
+# Papers recently shown to users, so a preview can be expanded to a full summary later
+recent_papers = TTLCache(maxsize=int(os.getenv("RECENT_PAPERS_SIZE", 4096)), ttl=float(os.getenv("RECENT_PAPERS_TTL", 24 * 3600)))
+
+async def warm_up():
+    """Start the parse workers, load the search and dedup indexes, the model and the MCP tools while the app already serves /healthz."""
+    try:
+        await scraper.parser.warm()
+    except Exception as e:
+        logger.error(f"Error starting PDF parse workers: {str(e)}", exc_info=True)
+    try:
+        # Both read everything they have stored, which takes a while once they are large
+        await asyncio.to_thread(scraper.index.load)
+        await asyncio.to_thread(summariser.dedup.load)
+    except Exception as e:
+        logger.error(f"Error loading the local index: {str(e)}", exc_info=True)
+    try:
+        # Importing litellm takes seconds; keep it off the event loop
+        await asyncio.to_thread(lambda: summariser.model)
+        await mcp_client.start()
+    except Exception as e:
+        # The first request that needs routing retries the tool load
+        logger.error(f"Error starting MCP client: {str(e)}", exc_info=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The PDF parsing pool lives as long as the app does
+    scraper.start()
+    jobs.start()
+    warm_up_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+        await jobs.close()
+        await mcp_client.close()
+        await scraper.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -47,11 +102,158 @@ app.add_middleware(
 class StreamRequest(BaseModel):
     message: str
     max_results: int = 3
+    pipelined: bool = True
+    trace: bool = False
+    # arxiv, local (offline, from papers seen before) or hybrid; defaults to SEARCH_SOURCE
+    source: Optional[Literal["arxiv", "local", "hybrid"]] = None
+    # full: summarise every paper; progressive: stream abstract previews first, then full summaries;
+    # preview: previews only, with full summaries on demand from POST /papers/{id}/summary
+    detail: Literal["full", "progressive", "preview"] = "full"
+    # Stream summaries as they are written (summary_delta events) in pipelined mode
+    deltas: bool = True
 
-scraper = PaperScraper()
-summariser = Summariser()
+# Jobs run outside admission control, so their size is capped here instead
+JOB_MAX_QUERIES = int(os.getenv("JOB_MAX_QUERIES", 50))
+JOB_MAX_RESULTS = int(os.getenv("JOB_MAX_RESULTS", 50))
+
+class JobRequest(BaseModel):
+    queries: List[str] = Field(max_length=JOB_MAX_QUERIES)
+    max_results: int = Field(3, ge=1, le=JOB_MAX_RESULTS)
 
-async def generate_responses(message: str, max_results: int) -> AsyncGenerator[str, None]:
+async def process_paper(paper: Dict, on_delta=None) -> Dict:
+    # A stored summary means there is nothing to download, parse or generate
+    cached = await summariser.cached_summary(paper)
+    if cached is not None:
+        return cached
+    parsed = await scraper.download_and_parse(paper)
+    # Failed downloads and parses come back as error text; don't summarise it
+    if parsed["text"].startswith("[Error"):
+        raise RuntimeError(parsed["text"])
+    return await summariser.summarise_paper(parsed, lookup=False, on_delta=on_delta)
+
+async def generate_previews(papers) -> AsyncGenerator[str, None]:
+    """Stream an abstract-based preview of every paper as soon as it is ready."""
+    tasks = [asyncio.create_task(summariser.preview(paper)) for paper in papers]
+    try:
+        for next_preview in asyncio.as_completed(tasks):
+            preview = await next_preview
+            paper = recent_papers.get(preview["id"]) or {}
+            yield json.dumps({
+                "type": "preview",
+                "preview": {
+                    **preview,
+                    "url": paper.get("pdf_url"),
+                    "authors": paper.get("authors", []),
+                    "categories": paper.get("categories", []),
+                }
+            }) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def generate_pipelined(papers, deltas: bool = True) -> AsyncGenerator[str, None]:
+    """Download, parse and summarise every paper independently, streaming each summary as soon as it is ready.
+
+    With ``deltas``, summaries are also streamed while they are written as
+    coalesced summary_delta events; the final summary event carries the full text.
+    """
+    yield json.dumps({
+        "type": "status",
+        "status": "Downloading, parsing and summarising papers..."
+    }) + "\n"
+
+    events = asyncio.Queue()
+    buffer = DeltaBuffer(
+        max_chars=int(os.getenv("STREAM_DELTA_CHARS", 256)),
+        max_delay=float(os.getenv("STREAM_DELTA_INTERVAL", 0.1))
+    )
+
+    async def run(paper):
+        on_delta = (lambda text: events.put_nowait(("delta", paper, text))) if deltas else None
+        try:
+            events.put_nowait(("done", paper, (await process_paper(paper, on_delta), None)))
+        except Exception as e:
+            events.put_nowait(("done", paper, (None, e)))
+
+    def flush():
+        return [json.dumps({
+            "type": "summary_delta",
+            "id": paper_id,
+            "delta": text
+        }) + "\n" for paper_id, text in buffer.flush()]
+
+    logger.info("Starting pipelined paper processing")
+    pipeline_start = time.time()
+    tasks = [asyncio.create_task(run(paper)) for paper in papers]
+    try:
+        done = 0
+        while done < len(tasks):
+            try:
+                kind, paper, result = await asyncio.wait_for(events.get(), timeout=buffer.time_to_flush())
+            except asyncio.TimeoutError:
+                for line in flush():
+                    yield line
+                continue
+            if kind == "delta":
+                buffer.add(paper["id"], result)
+                if buffer.due():
+                    for line in flush():
+                        yield line
+                continue
+
+            # The summary event supersedes anything still buffered for this paper
+            buffer.discard(paper["id"])
+            done += 1
+            summary, error = result
+            if error is not None:
+                logger.error(f"Error processing paper {paper['id']}: {str(error)}", exc_info=error)
+                yield json.dumps({
+                    "type": "error",
+                    "id": paper["id"],
+                    "message": f"Error summarising {paper['title']}: {str(error)}"
+                }) + "\n"
+                continue
+
+            elapsed = time.time() - pipeline_start
+            logger.info(f"Paper {paper['id']} summarised after {elapsed:.2f}s ({done}/{len(papers)})")
+            yield json.dumps({
+                "type": "summary",
+                "summary": summary
+            }) + "\n"
+            yield json.dumps({
+                "type": "status",
+                "status": f"Summarised {done}/{len(papers)} papers... [{elapsed:.2f}s]"
+            }) + "\n"
+    finally:
+        # Client went away or something failed: don't leave orphaned work behind
+        for task in tasks:
+            task.cancel()
+
+    logger.info(f"Pipelined processing completed in {time.time() - pipeline_start:.2f}s")
+
+async def generate_responses(message: str, max_results: int, pipelined: bool = True, trace: bool = False, source: Optional[str] = None, detail: str = "full", deltas: bool = True) -> AsyncGenerator[str, None]:
+    """Stream a request's events, recording its outcome and, if asked, a trace of its stages."""
+    request_trace = start_trace() if trace else None
+    # LLM calls made on behalf of this request are scheduled fairly against other requests
+    current_flow.set(str(uuid4()))
+    outcome = "cancelled"
+    with span("request"):
+        try:
+            failed = False
+            async for line in _generate_responses(message, max_results, pipelined, source, detail, deltas):
+                failed = failed or line.startswith('{"type": "error"')
+                yield line
+            outcome = "error" if failed else "ok"
+        finally:
+            requests_total.inc(outcome=outcome)
+
+    if request_trace is not None:
+        yield json.dumps({
+            "type": "trace",
+            "spans": request_trace.spans
+        }) + "\n"
+
+async def _generate_responses(message: str, max_results: int, pipelined: bool, source: Optional[str] = None, detail: str = "full", deltas: bool = True) -> AsyncGenerator[str, None]:
     start_time = time.time()
     logger.info(f"Starting new request - Query: {message}, Max results: {max_results}")
     
@@ -60,38 +262,62 @@ async def generate_responses(message: str, max_results: int) -> AsyncGenerator[s
         messages.append(HumanMessage(content=message))
         
         # LLM Tool Call
-        logger.info("Initiating LLM tool call")
+        logger.info("Routing request")
         llm_start = time.time()
-        response, tool = await get_llm_response(messages)
+        response, tool, prefetched = await query_router.route(
+            messages,
+            search=lambda query: scraper.aget_metadata(query, max_results, source=source),
+            can_search=lambda query: scraper.search_is_cheap(query, max_results, source=source)
+        )
         llm_time = time.time() - llm_start
-        logger.info(f"LLM tool call completed in {llm_time:.2f}s")
+        logger.info(f"Routing completed in {llm_time:.2f}s")
         
         if tool is not None:
             # Get paper metadata
+            where = "local papers" if (source or scraper.search_source) == "local" else "arXiv"
             yield json.dumps({
                 "type": "status",
-                "status": "Searching arXiv..."
+                "status": f"Searching {where}..."
             }) + "\n"
             
             try:
                 # arXiv Search
                 logger.info(f"Starting arXiv search with query: {tool['args']['query']}")
                 metadata_start = time.time()
-                papers = scraper.get_metadata(tool["args"]["query"], max_results)
+                if prefetched is not None:
+                    # Started while the LLM was still routing
+                    papers = await prefetched
+                else:
+                    papers = await scraper.aget_metadata(tool["args"]["query"], max_results, source=source)
                 metadata_time = time.time() - metadata_start
                 logger.info(f"arXiv search completed - Found {len(papers)} papers in {metadata_time:.2f}s")
+                for paper in papers:
+                    recent_papers.set(paper["id"], paper)
                 
                 yield json.dumps({
                     "type": "status",
-                    "status": f"Searching arXiv... [{metadata_time:.2f}s]"
+                    "status": f"Searching {where}... [{metadata_time:.2f}s]"
                 }) + "\n"
                 
                 # Stream all titles at once
                 yield json.dumps({
                     "type": "titles",
-                    "papers": [{"title": paper["title"], "url": paper["pdf_url"]} for paper in papers]
+                    "papers": [{"id": paper["id"], "title": paper["title"], "url": paper["pdf_url"]} for paper in papers]
                 }) + "\n"
                 
+                if detail != "full":
+                    async for line in generate_previews(papers):
+                        yield line
+                    if detail == "preview":
+                        logger.info(f"Previews completed in {time.time() - start_time:.2f}s")
+                        return
+
+                if pipelined:
+                    async for line in generate_pipelined(papers, deltas):
+                        yield line
+                    logger.info(f"Request completed successfully in {time.time() - start_time:.2f}s")
+                    return
+
                 # Process and stream summaries
                 yield json.dumps({
                     "type": "status",
@@ -171,18 +397,210 @@ async def generate_responses(message: str, max_results: int) -> AsyncGenerator[s
             "message": f"An unexpected error occurred: {str(e)}"
         }) + "\n"
 
+async def admit():
+    """Wait for an admission slot, turning the request away with Retry-After when saturated."""
+    try:
+        return await admission.acquire()
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected request ({e.reason}), retry after {e.retry_after}s")
+        raise HTTPException(status_code=e.status_code, detail=f"Server busy ({e.reason})", headers={"Retry-After": str(e.retry_after)})
+
+async def wait_for_disconnect(request: Request, interval: float = 0.5):
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+async def admitted(request: Request, granted_at: float, lines: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """Hold an admission slot for the life of a stream, and stop its work as soon as the client goes away.
+
+    The stream runs in its own task, so it is cancelled even while it is busy
+    downloading or summarising and has nothing to write.
+    """
+    queue = asyncio.Queue(maxsize=8)
+
+    async def pump():
+        try:
+            async for line in lines:
+                await queue.put(line)
+        except Exception as e:
+            logger.error(f"Error in stream: {str(e)}", exc_info=True)
+        await queue.put(None)
+
+    producer = asyncio.create_task(pump())
+    disconnected = asyncio.create_task(wait_for_disconnect(request))
+    try:
+        while True:
+            getter = asyncio.create_task(queue.get())
+            await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                logger.info("Client disconnected, cancelling its work")
+                return
+            line = getter.result()
+            if line is None:
+                return
+            yield line
+    finally:
+        producer.cancel()
+        disconnected.cancel()
+        admission.release(granted_at)
+
 @app.post("/stream")
-async def stream_response(request: StreamRequest):
+async def stream_response(request: StreamRequest, http_request: Request):
+    granted_at = await admit()
     try:
-        logger.info(f"Received new stream request - Query: {request.message}, Max results: {request.max_results}")
+        # Fewer papers per request when the server is busy
+        max_results = admission.cap_results(request.max_results)
+        logger.info(f"Received new stream request - Query: {request.message}, Max results: {max_results}")
         return StreamingResponse(
-            generate_responses(request.message, request.max_results),
-            media_type="application/json"
+            admitted(http_request, granted_at, generate_responses(
+                request.message, max_results, request.pipelined, request.trace, request.source, request.detail, request.deltas
+            )),
+            media_type="application/json",
+            headers={"X-Max-Results": str(max_results)}
         )
     except Exception as e:
+        admission.release(granted_at)
         logger.error(f"Error in stream endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def to_sse(lines: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    # Same events as the NDJSON stream, named by their type
+    async for line in lines:
+        yield f"event: {json.loads(line)['type']}\ndata: {line.rstrip()}\n\n"
+
+@app.get("/stream/sse")
+async def stream_sse(http_request: Request, request: StreamRequest = Depends()):
+    """Server-Sent Events variant of /stream for EventSource clients; takes the same fields as query parameters."""
+    granted_at = await admit()
+    max_results = admission.cap_results(request.max_results)
+    logger.info(f"Received new SSE stream request - Query: {request.message}, Max results: {max_results}")
+    return StreamingResponse(
+        admitted(http_request, granted_at, to_sse(generate_responses(
+            request.message, max_results, request.pipelined, request.trace, request.source, request.detail, request.deltas
+        ))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Max-Results": str(max_results)}
+    )
+
+async def stream_paper_summary(paper: Dict) -> AsyncGenerator[str, None]:
+    current_flow.set(str(uuid4()))
+    with span("request"):
+        async for line in generate_pipelined([paper]):
+            yield line
+
+@app.post("/papers/{paper_id:path}/summary")
+async def paper_summary(paper_id: str, http_request: Request, stream: bool = False):
+    """Full-text summary of one paper, e.g. when a user expands its preview.
+
+    With ``stream=true`` the summary is streamed as NDJSON summary_delta events
+    followed by the summary event.
+    """
+    paper = recent_papers.get(paper_id) or await asyncio.to_thread(scraper.paper, paper_id)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="Unknown paper; search for it first")
+    granted_at = await admit()
+    if stream:
+        return StreamingResponse(admitted(http_request, granted_at, stream_paper_summary(paper)), media_type="application/json")
+    current_flow.set(str(uuid4()))
+    with span("request"):
+        try:
+            return await process_paper(paper)
+        except Exception as e:
+            logger.error(f"Error summarising paper {paper_id}: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            admission.release(granted_at)
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    queries = [query.strip() for query in request.queries if query.strip()]
+    if not queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    job_id = jobs.submit(queries, request.max_results)
+    logger.info(f"Queued job {job_id} with {len(queries)} queries, max results {request.max_results}")
+    return jobs.store.progress(job_id)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    progress = jobs.store.progress(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return progress
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if jobs.store.job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(jobs.events(job_id), media_type="application/json")
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str):
+    progress = jobs.store.progress(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        **progress,
+        "results": jobs.store.queries(job_id),
+        "summaries": [
+            {"id": paper["paper_id"], "title": paper["title"], "url": paper["url"], "query": paper["query_idx"],
+             "status": paper["status"], "summary": paper["summary"], "error": paper["error"]}
+            for paper in jobs.store.papers(job_id)
+        ],
+    }
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness only: the process is up and serving
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    checks = {
+        "parser": scraper.parser.ready,
+        "local_index": scraper.index.loaded,
+        "dedup": summariser.dedup.loaded,
+        # The model is loaded and bound to the MCP tools
+        "llm": mcp_client.llm is not None,
+    }
+    ready = all(checks.values())
+    return JSONResponse({"ready": ready, "checks": checks}, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/llm")
+async def llm_stats():
+    return llm_scheduler.stats()
+
+@app.get("/stats/downloads")
+async def download_stats():
+    return scraper.downloader.stats()
+
+@app.get("/stats/summaries")
+async def summary_stats():
+    return await asyncio.to_thread(summariser.store.stats)
+
+@app.get("/stats/admission")
+async def admission_stats():
+    return admission.stats()
+
+@app.get("/stats/index")
+async def index_stats():
+    # Waits for the index to load rather than blocking the event loop on it
+    return await asyncio.to_thread(scraper.index.stats)
+
+@app.get("/stats/dedup")
+async def dedup_stats():
+    return await asyncio.to_thread(summariser.dedup.stats)
+
+@app.delete("/summaries")
+async def invalidate_summaries(paper_id: Optional[str] = None, model: Optional[str] = None, all: bool = False):
+    # Wiping every summary, previews included, has to be asked for explicitly
+    if paper_id is None and model is None and not all:
+        raise HTTPException(status_code=400, detail="Pass paper_id and/or model, or all=true to delete every summary")
+    return {"deleted": await asyncio.to_thread(summariser.invalidate, paper_id=paper_id, model=model)}
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting PaperScout server")
@@ -0,0 +1,183 @@
+"""Local stand-ins for arXiv, arxiv.org PDFs and the LLM, used by run_benchmark.py."""
+import asyncio
+import hashlib
+from urllib.parse import parse_qs
+from xml.sax.saxutils import escape
+from aiohttp import web
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+SECTIONS = ["Introduction", "Related Work", "Method", "Experiments", "Results", "Discussion", "Conclusion"]
+
+
+def make_pdf(paper_id, pages, words_per_page=350):
+    """Build a minimal, valid PDF with ``pages`` pages of extractable Helvetica text."""
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+    }
+    kids = []
+    font = 3 + 2 * pages
+    for page in range(pages):
+        page_obj, content_obj = 3 + 2 * page, 4 + 2 * page
+        kids.append(f"{page_obj} 0 R")
+        heading = f"{page + 1} {SECTIONS[page % len(SECTIONS)]}"
+        body = " ".join(f"{paper_id}-p{page}-w{i}" for i in range(words_per_page))
+        lines = [heading] + [body[i:i + 90] for i in range(0, len(body), 90)]
+        stream = "BT /F1 9 Tf 36 806 Td 11 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects[page_obj] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content_obj} 0 R >>"
+        )
+        objects[content_obj] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+    objects[font] = "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number in range(1, font + 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{objects[number]}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {font + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {font + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+class FakeArxivServer:
+    """Serves an arXiv-compatible Atom search API and synthetic PDFs on localhost.
+
+    Paper ids are derived from the query, so the same query always returns the
+    same papers and different queries mostly return different ones.
+    """
+
+    def __init__(self, pages=(8, 24), latency=0.05, pdf_latency=0.02, host="127.0.0.1", port=0):
+        self.pages = pages
+        self.latency = latency
+        self.pdf_latency = pdf_latency
+        self.host = host
+        self.port = port
+        self.searches = 0
+        self.pdf_requests = 0
+        self._pdfs = {}
+        self._runner = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def page_count(self, paper_id):
+        low, high = self.pages
+        return low + int(hashlib.sha1(paper_id.encode()).hexdigest(), 16) % (high - low + 1)
+
+    def paper_ids(self, query, n):
+        base = int(hashlib.sha1(query.encode()).hexdigest(), 16) % 90000
+        return [f"2401.{(base + i) % 100000:05d}v1" for i in range(n)]
+
+    def _entry(self, paper_id, index):
+        abstract = f"We study benchmark topic {paper_id}. " * 5
+        return f"""
+  <entry>
+    <id>http://arxiv.org/abs/{paper_id}</id>
+    <updated>2024-01-{index % 28 + 1:02d}T00:00:00Z</updated>
+    <published>2024-01-{index % 28 + 1:02d}T00:00:00Z</published>
+    <title>Synthetic paper {paper_id}</title>
+    <summary>{escape(abstract)}</summary>
+    <author><name>Bench Author</name></author>
+    <link href="http://arxiv.org/abs/{paper_id}" rel="alternate" type="text/html"/>
+    <link title="pdf" href="{self.base_url}/pdf/{paper_id}" rel="related" type="application/pdf"/>
+    <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>"""
+
+    async def handle_query(self, request):
+        self.searches += 1
+        await asyncio.sleep(self.latency)
+        args = parse_qs(request.query_string)
+        query = args.get("search_query", [""])[0]
+        start = int(args.get("start", ["0"])[0])
+        max_results = int(args.get("max_results", ["10"])[0])
+        ids = self.paper_ids(query, start + max_results)[start:]
+        entries = "".join(self._entry(paper_id, i) for i, paper_id in enumerate(ids))
+        feed = f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+  <title>ArXiv Query</title>
+  <id>{self.base_url}/api/query</id>
+  <updated>2024-01-01T00:00:00Z</updated>
+  <opensearch:totalResults>{start + len(ids)}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{max_results}</opensearch:itemsPerPage>{entries}
+</feed>"""
+        return web.Response(text=feed, content_type="application/atom+xml")
+
+    async def handle_pdf(self, request):
+        self.pdf_requests += 1
+        await asyncio.sleep(self.pdf_latency)
+        paper_id = request.match_info["paper_id"].removesuffix(".pdf")
+        if paper_id not in self._pdfs:
+            self._pdfs[paper_id] = make_pdf(paper_id, self.page_count(paper_id))
+        return web.Response(body=self._pdfs[paper_id], content_type="application/pdf")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/api/query", self.handle_query)
+        app.router.add_get("/pdf/{paper_id}", self.handle_pdf)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeChatModel:
+    """Chat model stand-in with configurable latency and output token throughput.
+
+    Implements the parts of the LangChain chat model interface PaperScout uses:
+    ``ainvoke``, ``astream`` and ``bind_tools``. When tools are bound, every
+    call routes to the first tool with the last message as the query.
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=200.0, output_tokens=250, model="fake-llm", tools=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.model = model
+        self.tools = tools
+        self.calls = 0
+        self.input_tokens = 0
+
+    def bind_tools(self, tools):
+        bound = FakeChatModel(self.latency, self.tokens_per_second, self.output_tokens, self.model, tools)
+        bound.parent = self
+        return bound
+
+    def _record(self, messages):
+        owner = getattr(self, "parent", self)
+        owner.calls += 1
+        owner.input_tokens += sum(len(str(message.content)) // 4 for message in messages)
+
+    def _words(self, messages):
+        return [f"token{i}" for i in range(self.output_tokens)]
+
+    async def ainvoke(self, messages, **kwargs):
+        self._record(messages)
+        if self.tools:
+            await asyncio.sleep(self.latency)
+            return AIMessage(content="", tool_calls=[{
+                "name": self.tools[0].name,
+                "args": {"query": str(messages[-1].content)},
+                "id": f"call_{self.calls}",
+            }])
+        await asyncio.sleep(self.latency + self.output_tokens / self.tokens_per_second)
+        return AIMessage(content="## Summary\n" + " ".join(self._words(messages)))
+
+    async def astream(self, messages, **kwargs):
+        self._record(messages)
+        await asyncio.sleep(self.latency)
+        yield AIMessageChunk(content="## Summary\n")
+        for word in self._words(messages):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield AIMessageChunk(content=word + " ")
@@ -0,0 +1,313 @@
+"""Offline end-to-end benchmark of the /stream pipeline.
+
+Runs the real app.generate_responses, PaperScraper and Summariser against a
+local fake arXiv API, a synthetic PDF server and a fake LLM, then reports
+per-stage p50/p95 latency, time to first byte / first summary, throughput and
+peak RSS, and how long a cold ``import app`` takes. Results are written as JSON
+so runs can be compared:
+
+    cd scout
+    python benchmarks/run_benchmark.py --requests 20 --concurrency 4 --output base.json
+    python benchmarks/run_benchmark.py --requests 20 --concurrency 4 --compare base.json
+    python benchmarks/run_benchmark.py --max-import-seconds 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+SCOUT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCOUT_DIR)
+
+from fakes import FakeArxivServer, FakeChatModel
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def describe(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values) if values else None,
+    }
+
+
+class RSSSampler:
+    """Tracks peak resident memory of this process plus its children (the PDF parse workers)."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    def sample(self):
+        if psutil is None:
+            import resource
+            self.peak = max(self.peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+            return
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.sample()
+
+
+def timed(stages, name, fn):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            stages[name].append(time.perf_counter() - start)
+    return wrapper
+
+
+async def run_request(app, message, max_results, pipelined):
+    start = time.perf_counter()
+    first_byte = first_delta = first_summary = None
+    summaries = errors = 0
+    async for line in app.generate_responses(message, max_results, pipelined):
+        now = time.perf_counter() - start
+        if first_byte is None:
+            first_byte = now
+        event = json.loads(line)
+        if event["type"] in ("summary", "summaries"):
+            summaries += 1 if event["type"] == "summary" else len(event["summaries"])
+            if first_summary is None:
+                first_summary = now
+        elif event["type"] == "summary_delta":
+            if first_delta is None:
+                first_delta = now
+        elif event["type"] == "error":
+            errors += 1
+    return {
+        "ttfb": first_byte,
+        "first_delta": first_delta,
+        "first_summary": first_summary,
+        "total": time.perf_counter() - start,
+        "summaries": summaries,
+        "errors": errors,
+    }
+
+
+def measure_import(module="app", repeat=3):
+    """Best-of-``repeat`` time to import ``module`` in a fresh interpreter, as a cold start would."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    env = {**os.environ, "PYTHONPATH": SCOUT_DIR}
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return min(times)
+
+
+async def benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="scout-bench-")
+    os.environ.setdefault("LLM_API_KEY", "benchmark")
+    os.environ["PAPER_CACHE_DIR"] = os.path.join(workdir, "paper_cache")
+    os.environ["SUMMARY_STORE_PATH"] = os.path.join(workdir, "summaries.db")
+    os.environ["ARXIV_MIN_INTERVAL"] = "0"
+    # app.py logs errors to ./paperscout.log; keep benchmark runs out of the repo
+    os.chdir(workdir)
+
+    cold_import_time = measure_import()
+
+    server = FakeArxivServer(pages=(args.min_pages, args.max_pages), latency=args.arxiv_latency)
+    await server.start()
+
+    import_start = time.perf_counter()
+    import arxiv
+    import app
+    import model
+    import_time = time.perf_counter() - import_start
+
+    llm = FakeChatModel(latency=args.llm_latency, tokens_per_second=args.llm_tps, output_tokens=args.llm_tokens)
+    app.summariser.model = llm
+    model.mcp_client.model = llm
+    app.scraper.client = arxiv.Client(delay_seconds=0, num_retries=0)
+    app.scraper.client.query_url_format = f"{server.base_url}/api/query?{{}}"
+
+    stages = defaultdict(list)
+    app.query_router.route = timed(stages, "routing", app.query_router.route)
+    app.scraper.aget_metadata = timed(stages, "search", app.scraper.aget_metadata)
+    app.scraper.downloader.download = timed(stages, "download", app.scraper.downloader.download)
+    app.scraper.parser.parse = timed(stages, "parse", app.scraper.parser.parse)
+    app.summariser.summarise_one = timed(stages, "summarise", app.summariser.summarise_one)
+
+    # Distinct queries are cold; a repeated pool exercises the caches
+    unique = max(1, int(args.requests * (1 - args.repeat_ratio)))
+    queries = [f"papers on benchmark topic {i % unique}" for i in range(args.requests)]
+
+    rss = RSSSampler()
+    results = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(query):
+        async with semaphore:
+            results.append(await run_request(app, query, args.max_results, not args.phased))
+
+    async with app.lifespan(app.app):
+        # Like a load balancer, only send traffic once /readyz passes
+        ready_start = time.perf_counter()
+        while (await app.readyz()).status_code != 200:
+            if time.perf_counter() - ready_start > 60:
+                raise RuntimeError("app did not become ready within 60s")
+            await asyncio.sleep(0.05)
+        ready_time = time.perf_counter() - ready_start
+        rss.start()
+        wall_start = time.perf_counter()
+        await asyncio.gather(*[one(query) for query in queries])
+        wall = time.perf_counter() - wall_start
+        await rss.stop()
+
+    await server.close()
+
+    papers = sum(result["summaries"] for result in results)
+    return {
+        "config": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "import_seconds": import_time,
+        "cold_import_seconds": cold_import_time,
+        "ready_seconds": ready_time,
+        "stages": {name: describe(values) for name, values in sorted(stages.items())},
+        "requests": {
+            "ttfb": describe([r["ttfb"] for r in results if r["ttfb"] is not None]),
+            "first_delta": describe([r["first_delta"] for r in results if r["first_delta"] is not None]),
+            "first_summary": describe([r["first_summary"] for r in results if r["first_summary"] is not None]),
+            "total": describe([r["total"] for r in results]),
+            "errors": sum(r["errors"] for r in results),
+        },
+        "throughput": {
+            "wall_seconds": wall,
+            "requests_per_second": len(results) / wall,
+            "papers_per_second": papers / wall,
+        },
+        "fakes": {
+            "arxiv_searches": server.searches,
+            "pdf_requests": server.pdf_requests,
+            "llm_calls": llm.calls,
+            "llm_input_tokens": llm.input_tokens,
+        },
+        "peak_rss_mb": rss.peak / 1024 ** 2,
+    }
+
+
+def report(result):
+    print(f"Imports: {result['import_seconds'] * 1000:.0f} ms (cold start {result['cold_import_seconds'] * 1000:.0f} ms)   "
+          f"Ready after: {result['ready_seconds'] * 1000:.0f} ms   Peak RSS: {result['peak_rss_mb']:.1f} MB")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}")
+    rows = list(result["stages"].items()) + [(f"req.{k}", v) for k, v in result["requests"].items() if k != "errors"]
+    for name, stats in rows:
+        if stats["count"]:
+            print(f"{name:<16}{stats['count']:>7}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}")
+    throughput = result["throughput"]
+    print(f"Throughput: {throughput['requests_per_second']:.2f} req/s, {throughput['papers_per_second']:.2f} papers/s "
+          f"over {throughput['wall_seconds']:.2f}s, {result['requests']['errors']} errors")
+
+
+def compare(result, baseline, threshold):
+    """Print p50/p95 changes against a previous run and return the metrics that regressed."""
+    regressions = []
+    print(f"\nCompared with baseline (regression threshold {threshold:.0%}):")
+    sections = [("stages", result["stages"], baseline.get("stages", {})),
+                ("requests", result["requests"], baseline.get("requests", {}))]
+    for section, current, previous in sections:
+        for name, stats in current.items():
+            if not isinstance(stats, dict) or not isinstance(previous.get(name), dict):
+                continue
+            for q in ("p50", "p95"):
+                old, new = previous[name].get(q), stats.get(q)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                flag = " REGRESSION" if change > threshold else ""
+                print(f"  {section}.{name}.{q}: {old * 1000:.1f} -> {new * 1000:.1f} ms ({change:+.0%}){flag}")
+                if flag:
+                    regressions.append(f"{section}.{name}.{q}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-results", type=int, default=3)
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="fraction of requests that repeat an earlier query")
+    parser.add_argument("--phased", action="store_true", help="use the non-pipelined stream")
+    parser.add_argument("--min-pages", type=int, default=8)
+    parser.add_argument("--max-pages", type=int, default=24)
+    parser.add_argument("--arxiv-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-tps", type=float, default=400.0, help="fake LLM output tokens per second")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="fake LLM output tokens per call")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--max-import-seconds", type=float, help="fail if a cold `import app` takes longer than this")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    result = asyncio.run(benchmark(args))
+    report(result)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {output}")
+    failed = False
+    if args.max_import_seconds is not None and result["cold_import_seconds"] > args.max_import_seconds:
+        print(f"\nCold import took {result['cold_import_seconds']:.2f}s, over the {args.max_import_seconds:.2f}s budget")
+        failed = True
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from paper_cache import split_version
+
+TOKEN = re.compile(r"[a-z0-9]+")
+# Words per shingle; long enough that unrelated papers share few shingles
+SHINGLE_WORDS = 5
+# Texts with fewer shingles than this (error messages, empty PDFs) are never matched
+MIN_SHINGLES = 50
+NUM_PERM = 128
+# 32 bands of 4 rows: papers above ~0.5 Jaccard similarity almost always share a bucket
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+_rng = np.random.default_rng(20240601)
+# Multiply-shift hash functions, one per permutation
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_MIX = np.array([0x9E3779B97F4A7C15 * (i + 1) & 0xFFFFFFFFFFFFFFFF for i in range(SHINGLE_WORDS)], dtype=np.uint64)
+
+
+def latest_versions(papers):
+    """Collapse several versions of the same arXiv paper into its latest, keeping the first one's position."""
+    latest = {}
+    for paper in papers:
+        base, version = split_version(paper["id"])
+        if base not in latest or version > split_version(latest[base]["id"])[1]:
+            latest[base] = paper
+    return list(latest.values())
+
+
+def shingles(text):
+    """Stable 32-bit hashes of every run of SHINGLE_WORDS consecutive words."""
+    tokens = TOKEN.findall(text.lower())
+    if len(tokens) < SHINGLE_WORDS:
+        return np.zeros(0, dtype=np.uint64)
+    vocabulary = {token: zlib.crc32(token.encode()) for token in set(tokens)}
+    hashes = np.fromiter((vocabulary[token] for token in tokens), dtype=np.uint64, count=len(tokens))
+    count = len(tokens) - SHINGLE_WORDS + 1
+    combined = np.zeros(count, dtype=np.uint64)
+    for i in range(SHINGLE_WORDS):
+        # Wrapping uint64 arithmetic is intended
+        combined += hashes[i:i + count] * _MIX[i]
+    return np.unique((combined ^ (combined >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+def minhash(values, block=8192):
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        hashed = (_A[:, None] * chunk[None, :] + _B[:, None]) >> np.uint64(32)
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+class DedupIndex:
+    """MinHash fingerprints of parsed papers, for spotting new versions and near-identical texts.
+
+    Every paper that is not a duplicate becomes an original. Its signature is
+    split into LSH bands, so a new paper is only compared with the originals it
+    shares a band with, and with the other versions of itself. Fingerprints and
+    the duplicate relationships found are kept in SQLite and survive restarts;
+    they are read back by ``load()``, which the first check runs if the app's
+    warm-up hasn't yet.
+    """
+
+    def __init__(self, path=None, threshold=None):
+        self.path = path or os.getenv("DEDUP_STORE_PATH", "./dedup.db")
+        # Set above 1 to disable matching
+        self.threshold = threshold or float(os.getenv("DEDUP_THRESHOLD", 0.75))
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._buckets = {}
+        self._versions = {}
+        self._duplicates = {}
+        self._conn = None
+        self.loaded = False
+
+    def load(self):
+        """Open the database and read every stored fingerprint into memory, once."""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    paper_id TEXT PRIMARY KEY,
+                    base_id TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    duplicate_of TEXT,
+                    similarity REAL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+            for paper_id, base_id, signature, duplicate_of, score in self._conn.execute(
+                "SELECT paper_id, base_id, signature, duplicate_of, similarity FROM fingerprints"
+            ):
+                if duplicate_of is None:
+                    self._add_original(paper_id, base_id, np.frombuffer(signature, dtype=np.uint32))
+                else:
+                    self._duplicates[paper_id] = {"duplicate_of": duplicate_of, "similarity": score}
+            self.loaded = True
+
+    def _bands(self, signature):
+        return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+    def _add_original(self, paper_id, base_id, signature):
+        self._signatures[paper_id] = signature
+        self._versions.setdefault(base_id, []).append(paper_id)
+        for bucket in self._bands(signature):
+            self._buckets.setdefault(bucket, []).append(paper_id)
+
+    def _best_match(self, base_id, signature):
+        candidates = set(self._versions.get(base_id, ()))
+        for bucket in self._bands(signature):
+            candidates.update(self._buckets.get(bucket, ()))
+        best = None
+        for candidate in candidates:
+            score = similarity(signature, self._signatures[candidate])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+        return best
+
+    def check(self, paper_id, text):
+        """Fingerprint a parsed paper and return ``{"duplicate_of", "similarity"}`` if an earlier paper has the same text, else None."""
+        self.load()
+        with self._lock:
+            if paper_id in self._signatures:
+                return None
+            if paper_id in self._duplicates:
+                return dict(self._duplicates[paper_id])
+
+        values = shingles(text)
+        if len(values) < MIN_SHINGLES:
+            return None
+        signature = minhash(values)
+        base_id = split_version(paper_id)[0]
+
+        # Matching and registering under one lock means two copies racing in become original and duplicate
+        with self._lock:
+            if paper_id in self._signatures:
+                return None
+            if paper_id in self._duplicates:
+                return dict(self._duplicates[paper_id])
+            match = self._best_match(base_id, signature)
+            duplicate_of, score = match if match else (None, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?)",
+                (paper_id, base_id, signature.tobytes(), duplicate_of, score, time.time())
+            )
+            self._conn.commit()
+            if match is None:
+                self._add_original(paper_id, base_id, signature)
+                return None
+            self._duplicates[paper_id] = {"duplicate_of": duplicate_of, "similarity": score}
+            return dict(self._duplicates[paper_id])
+
+    def duplicates_of(self, paper_id):
+        """IDs of the papers found to duplicate ``paper_id``."""
+        self.load()
+        with self._lock:
+            return [duplicate for duplicate, match in self._duplicates.items() if match["duplicate_of"] == paper_id]
+
+    def stats(self):
+        self.load()
+        with self._lock:
+            return {
+                "originals": len(self._signatures),
+                "duplicates": len(self._duplicates),
+                "threshold": self.threshold,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,42 @@
+import time
+
+
+class DeltaBuffer:
+    """Coalesces streamed text per key so clients get a few sizeable frames instead of one per token.
+
+    Pending text is flushed once any key has ``max_chars`` waiting or the
+    oldest pending text is ``max_delay`` seconds old.
+    """
+
+    def __init__(self, max_chars=256, max_delay=0.1):
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self._pending = {}
+        self._since = None
+
+    def add(self, key, text):
+        self._pending[key] = self._pending.get(key, "") + text
+        if self._since is None:
+            self._since = time.monotonic()
+
+    def discard(self, key):
+        self._pending.pop(key, None)
+        if not self._pending:
+            self._since = None
+
+    def time_to_flush(self):
+        """Seconds until pending text is due, or None when nothing is pending."""
+        if self._since is None:
+            return None
+        return max(0.0, self._since + self.max_delay - time.monotonic())
+
+    def due(self):
+        if self._since is None:
+            return False
+        return self.time_to_flush() == 0 or any(len(text) >= self.max_chars for text in self._pending.values())
+
+    def flush(self):
+        pending = list(self._pending.items())
+        self._pending = {}
+        self._since = None
+        return pending
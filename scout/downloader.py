@@ -0,0 +1,128 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from metrics import download_bytes, downloads_total, record_span, stage_seconds
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadManager:
+    """Shared, pooled HTTP session for PDF downloads.
+
+    Bodies are streamed to disk in chunks, concurrency is bounded, and 429/5xx
+    responses and connection errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, max_concurrency=None, limit_per_host=None, max_bytes=None, retries=None,
+                 connect_timeout=None, read_timeout=None, total_timeout=None, chunk_size=64 * 1024):
+        self.max_concurrency = max_concurrency or int(os.getenv("DOWNLOAD_MAX_CONCURRENCY", 8))
+        self.limit_per_host = limit_per_host or int(os.getenv("DOWNLOAD_LIMIT_PER_HOST", 4))
+        self.max_bytes = max_bytes or int(os.getenv("DOWNLOAD_MAX_BYTES", 50 * 1024 ** 2))
+        self.retries = retries if retries is not None else int(os.getenv("DOWNLOAD_RETRIES", 3))
+        self.total_timeout = total_timeout or float(os.getenv("DOWNLOAD_TOTAL_TIMEOUT", 120))
+        self.connect_timeout = connect_timeout or float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT", 10))
+        self.read_timeout = read_timeout or float(os.getenv("DOWNLOAD_READ_TIMEOUT", 30))
+        self.chunk_size = chunk_size
+        self.session = None
+        self.history = deque(maxlen=256)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            # aiohttp is only imported once there is something to download
+            import aiohttp
+            timeout = aiohttp.ClientTimeout(total=self.total_timeout, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), 60)
+            except ValueError:
+                pass
+        # Full jitter: spread retries out so concurrent downloads don't stampede arxiv.org together
+        return random.uniform(0, min(30, 0.5 * 2 ** attempt))
+
+    async def _fetch(self, url, dest):
+        tmp_path = f"{dest}.{id(asyncio.current_task())}.part"
+        size = 0
+        try:
+            async with self._get_session().get(url) as response:
+                if response.status != 200:
+                    return response.status, response.headers.get("Retry-After"), 0
+
+                if response.content_length and response.content_length > self.max_bytes:
+                    raise DownloadError(f"PDF is {response.content_length} bytes (limit {self.max_bytes})")
+
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise DownloadError(f"PDF exceeds {self.max_bytes} bytes")
+                        f.write(chunk)
+            os.replace(tmp_path, dest)
+            return 200, None, size
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def download(self, url, dest):
+        """Download ``url`` to ``dest`` and return the stats recorded for it."""
+        import aiohttp
+        stats = {"url": url, "bytes": 0, "attempts": 0, "status": None, "queued": 0.0, "seconds": 0.0}
+        queued_at = time.perf_counter()
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            stats["queued"] = started_at - queued_at
+            try:
+                for attempt in range(self.retries + 1):
+                    stats["attempts"] = attempt + 1
+                    retry_after = None
+                    try:
+                        status, retry_after, size = await self._fetch(url, dest)
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        status, error = None, e
+                    else:
+                        error = None
+                    stats["status"] = status
+
+                    if status == 200:
+                        stats["bytes"] = size
+                        download_bytes.inc(size)
+                        return stats
+                    if status is not None and status not in RETRY_STATUSES:
+                        raise DownloadError(f"HTTP {status}")
+                    if attempt == self.retries:
+                        raise DownloadError(f"HTTP {status}" if error is None else str(error) or type(error).__name__)
+                    await asyncio.sleep(self._backoff(attempt, retry_after))
+            finally:
+                stats["seconds"] = time.perf_counter() - started_at
+                self.history.append(stats)
+                downloads_total.inc(outcome="ok" if stats["status"] == 200 else "error")
+                stage_seconds.observe(stats["seconds"], stage="download")
+                record_span("download", started_at, stats["seconds"], url=url, bytes=stats["bytes"])
+
+    def stats(self):
+        downloads = list(self.history)
+        completed = [d for d in downloads if d["status"] == 200]
+        return {
+            "downloads": len(downloads),
+            "failed": len(downloads) - len(completed),
+            "bytes": sum(d["bytes"] for d in completed),
+            "seconds": sum(d["seconds"] for d in completed),
+            "retries": sum(d["attempts"] - 1 for d in downloads),
+            "recent": downloads[-20:],
+        }
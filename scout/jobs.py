@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from uuid import uuid4
+from llm_scheduler import current_flow
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """SQLite record of batch jobs, their queries and every paper they found.
+
+    Paper rows are written as soon as each paper finishes, which is what lets a
+    restarted worker pick a job up without redoing finished papers.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("JOB_STORE_PATH", "./jobs.db")
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        # Opened on first use so importing the app doesn't touch the disk
+        with self._open_lock:
+            if self._connection is None:
+                self._connection = self._open()
+            return self._connection
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                max_results INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS job_queries (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS job_papers (
+                job_id TEXT NOT NULL,
+                paper_id TEXT NOT NULL,
+                query_idx INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                summary TEXT,
+                error TEXT,
+                PRIMARY KEY (job_id, paper_id)
+            );
+        """)
+        conn.commit()
+        return conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def create(self, queries, max_results):
+        job_id = str(uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT INTO jobs VALUES (?, 'queued', ?, ?, ?, NULL)", (job_id, max_results, now, now))
+            self._conn.executemany(
+                "INSERT INTO job_queries VALUES (?, ?, ?, 'pending', NULL)",
+                [(job_id, i, query) for i, query in enumerate(queries)]
+            )
+            self._conn.commit()
+        return job_id
+
+    def set_status(self, job_id, status, error=None):
+        self._execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?", (status, error, time.time(), job_id))
+
+    def set_query_status(self, job_id, idx, status, error=None):
+        self._execute("UPDATE job_queries SET status = ?, error = ? WHERE job_id = ? AND idx = ?", (status, error, job_id, idx))
+
+    def add_papers(self, job_id, idx, papers):
+        with self._lock:
+            # A paper found by several queries is processed once per job
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_papers VALUES (?, ?, ?, ?, ?, 'pending', NULL, NULL)",
+                [(job_id, paper["id"], idx, paper["title"], paper["pdf_url"]) for paper in papers]
+            )
+            self._conn.commit()
+
+    def finish_paper(self, job_id, paper_id, summary=None, error=None):
+        self._execute(
+            "UPDATE job_papers SET status = ?, summary = ?, error = ? WHERE job_id = ? AND paper_id = ?",
+            ("failed" if error else "done", summary, error, job_id, paper_id)
+        )
+
+    def job(self, job_id):
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def queries(self, job_id):
+        return self._query("SELECT idx, query, status, error FROM job_queries WHERE job_id = ? ORDER BY idx", (job_id,))
+
+    def papers(self, job_id, status=None):
+        if status is None:
+            return self._query("SELECT * FROM job_papers WHERE job_id = ? ORDER BY query_idx, rowid", (job_id,))
+        return self._query("SELECT * FROM job_papers WHERE job_id = ? AND status = ? ORDER BY query_idx, rowid", (job_id, status))
+
+    def unfinished(self):
+        return [row["id"] for row in self._query("SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at")]
+
+    def progress(self, job_id):
+        job = self.job(job_id)
+        if job is None:
+            return None
+        counts = {row["status"]: row["n"] for row in self._query(
+            "SELECT status, COUNT(*) AS n FROM job_papers WHERE job_id = ? GROUP BY status", (job_id,)
+        )}
+        queries = self.queries(job_id)
+        return {
+            "id": job_id,
+            "status": job["status"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+            "queries": {"total": len(queries), "done": sum(q["status"] != "pending" for q in queries)},
+            "papers": {"total": sum(counts.values()), **{status: counts.get(status, 0) for status in ("pending", "done", "failed")}},
+        }
+
+
+class JobManager:
+    """Background workers that run queued batch jobs with the shared scraper and summariser."""
+
+    def __init__(self, scraper, summariser, store=None, workers=None, paper_concurrency=None):
+        self.scraper = scraper
+        self.summariser = summariser
+        self.store = store or JobStore()
+        self.workers = workers or int(os.getenv("JOB_WORKERS", 2))
+        self.paper_concurrency = paper_concurrency or int(os.getenv("JOB_PAPER_CONCURRENCY", 4))
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._subscribers = {}
+
+    def start(self):
+        if self._tasks:
+            return
+        # Pick up whatever was queued or running when the process last stopped
+        for job_id in self.store.unfinished():
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, queries, max_results):
+        job_id = self.store.create(queries, max_results)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def _publish(self, job_id, event):
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    async def events(self, job_id):
+        """Yield NDJSON progress lines for a job until it finishes."""
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            progress = self.store.progress(job_id)
+            yield json.dumps({"type": "progress", **progress}) + "\n"
+            while progress["status"] in ("queued", "running"):
+                event = await queue.get()
+                yield json.dumps(event) + "\n"
+                if event["type"] == "progress":
+                    progress = event
+        finally:
+            self._subscribers[job_id].discard(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                # Shutting down: leave the job as 'running' so it resumes on the next start
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+                self.store.set_status(job_id, "failed", str(e))
+                self._publish(job_id, {"type": "progress", **self.store.progress(job_id)})
+
+    async def _process_paper(self, job_id, paper, semaphore):
+        async with semaphore:
+            try:
+                summary = await self.summariser.cached_summary(paper)
+                if summary is None:
+                    parsed = await self.scraper.download_and_parse(paper)
+                    if parsed["text"].startswith("[Error"):
+                        raise RuntimeError(parsed["text"])
+                    summary = await self.summariser.summarise_paper(parsed, lookup=False)
+                self.store.finish_paper(job_id, paper["id"], summary=summary["summary"])
+                self._publish(job_id, {"type": "paper", "id": paper["id"], "title": paper["title"], "status": "done"})
+            except Exception as e:
+                logger.error(f"Job {job_id} paper {paper['id']} failed: {str(e)}")
+                self.store.finish_paper(job_id, paper["id"], error=str(e))
+                self._publish(job_id, {"type": "paper", "id": paper["id"], "title": paper["title"], "status": "failed", "error": str(e)})
+
+    async def _run(self, job_id):
+        job = self.store.job(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return
+        current_flow.set(f"job:{job_id}")
+        self.store.set_status(job_id, "running")
+        self._publish(job_id, {"type": "progress", **self.store.progress(job_id)})
+
+        for query in self.store.queries(job_id):
+            if query["status"] != "pending":
+                continue
+            try:
+                papers = await self.scraper.aget_metadata(query["query"], job["max_results"])
+                self.store.add_papers(job_id, query["idx"], papers)
+                self.store.set_query_status(job_id, query["idx"], "done")
+            except Exception as e:
+                logger.error(f"Job {job_id} query {query['query']!r} failed: {str(e)}")
+                self.store.set_query_status(job_id, query["idx"], "failed", str(e))
+            self._publish(job_id, {"type": "progress", **self.store.progress(job_id)})
+
+        semaphore = asyncio.Semaphore(self.paper_concurrency)
+        pending = [
+            {"id": row["paper_id"], "title": row["title"], "pdf_url": row["url"]}
+            for row in self.store.papers(job_id, status="pending")
+        ]
+        await asyncio.gather(*[self._process_paper(job_id, paper, semaphore) for paper in pending])
+
+        self.store.set_status(job_id, "done")
+        self._publish(job_id, {"type": "progress", **self.store.progress(job_id)})
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from metrics import llm_queue_wait_seconds, registry
+
+logger = logging.getLogger(__name__)
+
+# Which request an LLM call belongs to; the scheduler round-robins between these
+current_flow = ContextVar("llm_flow", default="default")
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing * 60 / self.capacity)
+
+    def consume(self, amount):
+        self._refill()
+        # May go negative when a call used more than estimated; later calls then wait it off
+        self.tokens -= amount
+
+
+def is_rate_limit(error):
+    return getattr(error, "status_code", None) == 429 or "RateLimit" in type(error).__name__
+
+
+class LLMScheduler:
+    """Process-wide gate for LLM calls.
+
+    Caps the number of calls in flight, keeps each provider within its
+    requests-per-minute and tokens-per-minute budgets, retries 429s with
+    backoff, and serves waiting requests round-robin so one large request
+    can't starve the others.
+    """
+
+    def __init__(self, provider=None, max_in_flight=None, rpm=None, tpm=None, retries=None, expected_output_tokens=None):
+        self.provider = provider or os.getenv("LLM_PROVIDER", "default")
+        self.max_in_flight = max_in_flight or int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+        self.rpm = rpm if rpm is not None else int(os.getenv("LLM_RPM", 0))
+        self.tpm = tpm if tpm is not None else int(os.getenv("LLM_TPM", 0))
+        self.retries = retries if retries is not None else int(os.getenv("LLM_RETRIES", 4))
+        self.expected_output_tokens = expected_output_tokens or int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", 500))
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self._buckets = {}
+        self._flows = OrderedDict()
+        self._timer = None
+
+        registry.gauge("scout_llm_in_flight", "LLM calls currently running", function=lambda: {(): self.in_flight})
+        registry.gauge("scout_llm_queue_depth", "LLM calls waiting for the scheduler", function=lambda: {(): self.queued})
+
+    @property
+    def queued(self):
+        return sum(len(waiters) for waiters in self._flows.values())
+
+    def _buckets_for(self, provider):
+        if provider not in self._buckets:
+            self._buckets[provider] = (
+                TokenBucket(self.rpm) if self.rpm else None,
+                TokenBucket(self.tpm) if self.tpm else None,
+            )
+        return self._buckets[provider]
+
+    def _rate_wait(self, provider, tokens):
+        requests, token_budget = self._buckets_for(provider)
+        return max(
+            requests.wait_time(1) if requests else 0.0,
+            token_budget.wait_time(tokens) if token_budget else 0.0,
+        )
+
+    def _dispatch(self):
+        self._timer = None
+        while self._flows and self.in_flight < self.max_in_flight:
+            flow, waiters = next(iter(self._flows.items()))
+            future, provider, tokens = waiters[0]
+            if future.done():
+                # Cancelled while queued
+                waiters.popleft()
+            else:
+                wait = self._rate_wait(provider, tokens)
+                if wait > 0:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                    return
+                waiters.popleft()
+                requests, token_budget = self._buckets_for(provider)
+                if requests:
+                    requests.consume(1)
+                if token_budget:
+                    token_budget.consume(tokens)
+                self.in_flight += 1
+                future.set_result(None)
+
+            # Round-robin: the flow that was just served goes to the back of the line
+            if waiters:
+                self._flows.move_to_end(flow)
+            else:
+                del self._flows[flow]
+
+    def _release(self):
+        self.in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    def record_usage(self, provider, estimated, actual):
+        """Charge the token budget for the difference between an estimate and real usage."""
+        _, token_budget = self._buckets_for(provider or self.provider)
+        if token_budget and actual:
+            token_budget.consume(actual - estimated)
+
+    @asynccontextmanager
+    async def slot(self, tokens=0, provider=None):
+        """Wait for permission to make one LLM call that is expected to use ``tokens`` tokens."""
+        provider = provider or self.provider
+        flow = current_flow.get()
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, provider, tokens)
+        self._flows.setdefault(flow, deque()).append(entry)
+        queued_at = time.perf_counter()
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; give the slot back
+                self._release()
+            else:
+                future.cancel()
+                waiters = self._flows.get(flow)
+                if waiters is not None and entry in waiters:
+                    waiters.remove(entry)
+                    if not waiters:
+                        del self._flows[flow]
+            raise
+
+        wait = time.perf_counter() - queued_at
+        self.granted += 1
+        self.total_wait += wait
+        llm_queue_wait_seconds.observe(wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def estimate_tokens(self, messages):
+        return sum(len(str(message.content)) for message in messages) // 4 + self.expected_output_tokens
+
+    async def ainvoke(self, llm, messages, provider=None):
+        """``llm.ainvoke(messages)`` under the scheduler, retrying rate-limit errors with backoff."""
+        tokens = self.estimate_tokens(messages)
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.slot(tokens, provider):
+                    response = await llm.ainvoke(messages)
+            except Exception as e:
+                if not is_rate_limit(e) or attempt == self.retries:
+                    raise
+                self.rate_limited += 1
+                delay = random.uniform(0, min(60, 2 ** attempt))
+                logger.warning(f"LLM rate limited, retrying in {delay:.1f}s ({attempt + 1}/{self.retries})")
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage_metadata", None) or {}
+            self.record_usage(provider, tokens, usage.get("total_tokens"))
+            return response
+
+    async def astream(self, llm, messages, provider=None):
+        """``llm.astream(messages)`` under the scheduler. Rate-limit errors are retried until the first chunk arrives."""
+        tokens = self.estimate_tokens(messages)
+        for attempt in range(self.retries + 1):
+            started = False
+            used = 0
+            try:
+                async with self.slot(tokens, provider):
+                    async for chunk in llm.astream(messages):
+                        started = True
+                        used += (getattr(chunk, "usage_metadata", None) or {}).get("total_tokens", 0)
+                        yield chunk
+            except Exception as e:
+                if started or not is_rate_limit(e) or attempt == self.retries:
+                    raise
+                self.rate_limited += 1
+                delay = random.uniform(0, min(60, 2 ** attempt))
+                logger.warning(f"LLM rate limited, retrying in {delay:.1f}s ({attempt + 1}/{self.retries})")
+                await asyncio.sleep(delay)
+                continue
+
+            self.record_usage(provider, tokens, used)
+            return
+
+    def stats(self):
+        return {
+            "provider": self.provider,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "waiting_requests": len(self._flows),
+            "granted": self.granted,
+            "mean_wait": self.total_wait / self.granted if self.granted else 0.0,
+            "rate_limited_retries": self.rate_limited,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+        }
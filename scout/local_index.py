@@ -0,0 +1,222 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+import numpy as np
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were which with we our
+not but can these those their than then there been into also using use used via
+""".split())
+# A term in the title counts as much as this many occurrences in the body
+TITLE_WEIGHT = 3
+ABSTRACT_WEIGHT = 2
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def term_counts(title, abstract="", text=""):
+    counts = Counter(tokenize(text or ""))
+    for token in tokenize(abstract or ""):
+        counts[token] += ABSTRACT_WEIGHT
+    for token in tokenize(title or ""):
+        counts[token] += TITLE_WEIGHT
+    return counts
+
+
+class LocalIndex:
+    """BM25 index over the titles, abstracts and full text of papers we have already seen.
+
+    Documents are persisted in SQLite as term counts, so the index survives
+    restarts without re-reading any PDFs. In memory every term keeps a posting
+    list of document slots and term frequencies in flat arrays, and a query is
+    scored with a few vectorised NumPy operations over only the documents that
+    contain its terms. Nothing is read from disk until ``load()``: the app
+    calls it while warming up, and every other method calls it on first use.
+    That can take seconds, so callers on the event loop check ``loaded`` or
+    call these methods in a thread.
+    """
+
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path or os.getenv("LOCAL_INDEX_PATH", "./local_index.db")
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = None
+        self.loaded = False
+
+    def load(self):
+        """Open the database and read every stored document into memory, once."""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS papers (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    abstract TEXT,
+                    pdf_url TEXT NOT NULL,
+                    terms TEXT NOT NULL,
+                    has_text INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+            self._load()
+            self.loaded = True
+
+    def _load(self):
+        self._ids = []
+        self._slots = {}
+        self._meta = {}
+        self._lengths = array("f")
+        self._alive = array("b")
+        self._postings = {}
+        self._total_length = 0.0
+        self._dead = 0
+        for paper_id, title, abstract, pdf_url, terms, has_text in self._conn.execute(
+            "SELECT id, title, abstract, pdf_url, terms, has_text FROM papers"
+        ):
+            self._insert(paper_id, {"title": title, "abstract": abstract, "pdf_url": pdf_url, "has_text": bool(has_text)},
+                         json.loads(terms))
+
+    def _insert(self, paper_id, meta, counts):
+        old = self._slots.get(paper_id)
+        if old is not None:
+            # Superseded documents stay in the posting lists but no longer score
+            self._alive[old] = 0
+            self._total_length -= self._lengths[old]
+            self._dead += 1
+
+        slot = len(self._ids)
+        self._ids.append(paper_id)
+        self._slots[paper_id] = slot
+        self._meta[paper_id] = meta
+        length = float(sum(counts.values()))
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._total_length += length
+        for term, count in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("i"), array("f"))
+            postings[0].append(slot)
+            postings[1].append(count)
+
+    def __len__(self):
+        self.load()
+        return len(self._slots)
+
+    def has_text(self, paper_id):
+        self.load()
+        meta = self._meta.get(paper_id)
+        return meta is not None and meta["has_text"]
+
+    def get(self, paper_id):
+        self.load()
+        with self._lock:
+            meta = self._meta.get(paper_id)
+        if meta is None:
+            return None
+        return {"id": paper_id, "title": meta["title"], "pdf_url": meta["pdf_url"], "abstract": meta["abstract"]}
+
+    def add(self, paper_id, title, pdf_url, abstract=None, text=None):
+        """Index a paper, or re-index it when its full text becomes available."""
+        self.load()
+        with self._lock:
+            meta = self._meta.get(paper_id)
+        if meta is not None:
+            if meta["has_text"] and text is None:
+                return
+            abstract = abstract or meta["abstract"]
+        counts = term_counts(title, abstract, text)
+        if not counts:
+            return
+        meta = {"title": title, "abstract": abstract, "pdf_url": pdf_url, "has_text": text is not None}
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (paper_id, title, abstract, pdf_url, json.dumps(counts), int(text is not None), time.time())
+            )
+            self._conn.commit()
+            self._insert(paper_id, meta, counts)
+            if self._dead > 1000 and self._dead > len(self._slots):
+                self._load()
+
+    def search(self, query, n):
+        """Return up to ``n`` papers ranked by BM25 score, each with the fraction of query terms it contains."""
+        self.load()
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            live = len(self._slots)
+            if not terms or not live:
+                return []
+            alive = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+            lengths = np.frombuffer(self._lengths, dtype=np.float32)
+            avg_length = self._total_length / live
+            norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+            scores = np.zeros(len(self._ids), dtype=np.float64)
+            matched = np.zeros(len(self._ids), dtype=np.int32)
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                slots = np.frombuffer(postings[0], dtype=np.int32)
+                live_postings = alive[slots]
+                slots = slots[live_postings]
+                if not len(slots):
+                    continue
+                tf = np.frombuffer(postings[1], dtype=np.float32)[live_postings]
+                idf = math.log(1 + (live - len(slots) + 0.5) / (len(slots) + 0.5))
+                # Each document appears at most once per posting list, so plain fancy indexing is safe
+                scores[slots] += idf * tf * (self.k1 + 1) / (tf + norm[slots])
+                matched[slots] += 1
+
+            candidates = np.flatnonzero(matched)
+            if len(candidates) > n:
+                candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            results = []
+            for slot in candidates:
+                paper_id = self._ids[slot]
+                meta = self._meta[paper_id]
+                results.append({
+                    "id": paper_id,
+                    "title": meta["title"],
+                    "pdf_url": meta["pdf_url"],
+                    "abstract": meta["abstract"],
+                    "score": float(scores[slot]),
+                    "coverage": float(matched[slot]) / len(terms),
+                })
+            return results
+
+    def stats(self):
+        self.load()
+        with self._lock:
+            return {
+                "documents": len(self._slots),
+                "with_full_text": sum(meta["has_text"] for meta in self._meta.values()),
+                "terms": len(self._postings),
+                "superseded": self._dead,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self.loaded = False
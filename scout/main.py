@@ -17,7 +17,10 @@ async def stream_response(session: aiohttp.ClientSession, message: str, max_resu
 
             # Store titles and summaries for later printing
             titles: List[Dict[str, str]] = []
-            summaries: List[str] = []
+            summaries: List[Dict[str, str]] = []
+            # Text printed so far for summaries that are still streaming in
+            drafts: Dict[str, str] = {}
+            current = None
 
             async for line in response.content:
                 if not line.strip():
@@ -40,8 +43,41 @@ async def stream_response(session: aiohttp.ClientSession, message: str, max_resu
                         for i, (title, summary) in enumerate(zip(titles, summaries), 1):
                             print(f"\nPaper {i}: {title['title']}")
                             print("-" * 80)
-                            print(summary)
+                            print(summary["summary"])
                             print("-" * 80)
+                    elif message_type == "summary_delta":
+                        paper_id = data["id"]
+                        if paper_id not in drafts:
+                            title = next((paper["title"] for paper in titles if paper.get("id") == paper_id), paper_id)
+                            print(f"\nPaper {len(summaries) + len(drafts) + 1}: {title}")
+                            print("-" * 80)
+                            drafts[paper_id] = ""
+                        elif current != paper_id:
+                            # Summaries stream concurrently; label each switch between papers
+                            print(f"\n[{paper_id}]")
+                        current = paper_id
+                        drafts[paper_id] += data["delta"]
+                        sys.stdout.write(data["delta"])
+                        sys.stdout.flush()
+                    elif message_type == "summary":
+                        summary = data["summary"]
+                        summaries.append(summary)
+                        draft = drafts.pop(summary["id"], None)
+                        if draft is not None and current == summary["id"] and summary["summary"].startswith(draft):
+                            # Finish the streamed text rather than printing it again
+                            print(summary["summary"][len(draft):])
+                        else:
+                            print(f"\nPaper {len(summaries)}: {summary['title']}")
+                            print("-" * 80)
+                            print(summary["summary"])
+                        if summary.get("duplicate_of"):
+                            print(f"(Same paper as {summary['duplicate_of']}, so its summary was reused)")
+                        print("-" * 80)
+                        current = None
+                    elif message_type == "preview":
+                        preview = data["preview"]
+                        print(f"\nPreview: {preview['title']}")
+                        print(preview["preview"])
                     elif message_type == "message":
                         print(f"\n{data['message']}")
                     elif message_type == "error":
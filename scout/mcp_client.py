@@ -0,0 +1,87 @@
+from langchain_core.messages import SystemMessage
+from metrics import record_llm_call
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MCPClientManager:
+    """The MCP tool list and the tool-bound LLM built from it.
+
+    The app runs searches and summaries itself and only needs the tool schemas
+    to route, so they are read from one short-lived server session at startup.
+    """
+
+    system_prompt = "You are a helpful assistant that can find scientific papers and summarise them."
+
+    def __init__(self, load_model, server_params, scheduler=None, init_timeout=None):
+        self.load_model = load_model
+        self._model = None
+        self.server_params = server_params
+        self.scheduler = scheduler
+        self.init_timeout = init_timeout or float(os.getenv("MCP_INIT_TIMEOUT", 30))
+        self.tools = None
+        self.llm = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self.load_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    async def load_tools(self):
+        # The MCP SDK is slow to import, so it is only loaded once the tools are needed
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        from langchain_mcp_adapters.tools import load_mcp_tools
+
+        async with stdio_client(StdioServerParameters(**self.server_params)) as (read, write):
+            async with ClientSession(read, write) as session:
+                await asyncio.wait_for(session.initialize(), timeout=self.init_timeout)
+                return await load_mcp_tools(session)
+
+    async def start(self):
+        async with self._start_lock:
+            if self.llm is not None:
+                return
+            self.tools = await self.load_tools()
+            # Building the model imports litellm; keep that off the event loop
+            model = await asyncio.to_thread(lambda: self.model)
+            self.llm = model.bind_tools(self.tools)
+            logger.info(f"MCP client started with tools {[tool.name for tool in self.tools]}")
+
+    async def close(self):
+        self.tools = None
+        self.llm = None
+
+    async def get_llm_response(self, messages):
+        if self.llm is None:
+            await self.start()
+
+        messages = [SystemMessage(content=self.system_prompt), *messages]
+        start = time.perf_counter()
+        if self.scheduler is not None:
+            response = await self.scheduler.ainvoke(self.llm, messages)
+        else:
+            response = await self.llm.ainvoke(messages)
+        record_llm_call("routing", time.perf_counter() - start, messages, response)
+
+        if response.tool_calls:
+            # Only the routing decision is needed here: the app runs the search and summaries itself
+            tool_call = response.tool_calls[0]
+            logger.debug(f"Tool call: {tool_call['name']} with args: {tool_call['args']}")
+            tool = {
+                "name": tool_call["name"],
+                "args": tool_call["args"]
+            }
+            return response.content, tool
+
+        return response.content, None
@@ -1,13 +1,101 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from contextlib import asynccontextmanager
 import asyncio
+import os
+import signal
+import sys
+
+# Run as a script from mcp_servers/, so make the scout modules importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ScoutState:
+    """Scraper and summariser kept warm for the life of the server process.
+
+    They are built on the first tool call rather than at startup, so server
+    processes that are only asked for their tool list stay light.
+    """
+
+    def __init__(self):
+        self.scraper = None
+        self.summariser = None
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        async with self._lock:
+            if self.scraper is None:
+                from scraper import PaperScraper
+                from summariser import Summariser
+                self.scraper = PaperScraper()
+                self.scraper.start()
+                self.summariser = Summariser()
+        return self.scraper, self.summariser
+
+    async def close(self):
+        if self.scraper is not None:
+            await self.scraper.close()
+
+
+@asynccontextmanager
+async def lifespan(server):
+    state = ScoutState()
+    try:
+        yield state
+    finally:
+        await state.close()
+
+
+mcp = FastMCP("Paper-Scout", lifespan=lifespan)
+
+
+async def summarise(scraper, summariser, paper):
+    result = {
+        "id": paper["id"],
+        "title": paper["title"],
+        "url": paper["pdf_url"],
+        "authors": paper.get("authors", []),
+        "summary": None,
+        "error": None,
+    }
+    try:
+        summary = await summariser.cached_summary(paper)
+        if summary is None:
+            parsed = await scraper.download_and_parse(paper)
+            if parsed["text"].startswith("[Error"):
+                raise RuntimeError(parsed["text"])
+            summary = await summariser.summarise_paper(parsed, lookup=False)
+        result["summary"] = summary["summary"]
+    except Exception as e:
+        result["error"] = str(e)
+    return result
 
-mcp = FastMCP("Paper-Scout")
 
 @mcp.tool()
-async def find_papers_and_summarise(query: str) -> str:
-    """Finds scientific papers and summarises them"""
-    await asyncio.sleep(1)
-    return query
+async def find_papers_and_summarise(query: str, ctx: Context, max_results: int = 3) -> dict:
+    """Finds scientific papers on arXiv matching the query and summarises each one from its full text"""
+    scraper, summariser = await ctx.request_context.lifespan_context.get()
+    papers = await scraper.aget_metadata(query, max_results)
+    await ctx.report_progress(0, len(papers), f"Found {len(papers)} papers")
+
+    results = {}
+    tasks = [asyncio.create_task(summarise(scraper, summariser, paper)) for paper in papers]
+    try:
+        for done, next_result in enumerate(asyncio.as_completed(tasks), 1):
+            result = await next_result
+            results[result["id"]] = result
+            await ctx.report_progress(done, len(papers), f"Summarised {result['title']}")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return {
+        "query": query,
+        # Search order, not completion order
+        "papers": [results[paper["id"]] for paper in papers],
+    }
+
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    # Clients stop the server with SIGTERM; exit cleanly so the lifespan shuts the pool down
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    mcp.run(transport="stdio")
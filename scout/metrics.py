@@ -0,0 +1,178 @@
+"""Minimal in-process metrics with Prometheus text exposition and optional per-request traces.
+
+Everything runs on the event loop thread, so recording a sample is a couple of
+dict operations with no locking.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Trace of the current request, if the client asked for one
+current_trace = ContextVar("current_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(labelnames, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        self.values[tuple(labels.get(name, "") for name in self.labelnames)] = value
+
+    def samples(self):
+        if self.function is not None:
+            # Sampled at scrape time, e.g. queue depths owned by another object
+            for key, value in self.function().items():
+                self.values[key if isinstance(key, tuple) else (key,)] = value
+        return super().samples()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram("scout_stage_seconds", "Duration of pipeline stages", ["stage"])
+requests_total = registry.counter("scout_requests_total", "Stream requests by outcome", ["outcome"])
+cache_requests = registry.counter("scout_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+download_bytes = registry.counter("scout_download_bytes_total", "Bytes of PDF downloaded")
+downloads_total = registry.counter("scout_downloads_total", "PDF downloads by outcome", ["outcome"])
+parse_page_seconds = registry.histogram(
+    "scout_parse_page_seconds", "Time to extract the text of one PDF page",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+llm_seconds = registry.histogram("scout_llm_seconds", "LLM call latency", ["purpose"])
+llm_queue_wait_seconds = registry.histogram("scout_llm_queue_wait_seconds", "Time LLM calls wait for the scheduler")
+llm_tokens = registry.counter("scout_llm_tokens_total", "LLM tokens by purpose and direction", ["purpose", "direction"])
+routing_decisions = registry.counter("scout_routing_decisions_total", "Routing decisions by how they were made", ["path"])
+
+
+class Trace:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, start, duration, **labels):
+        self.spans.append({
+            "name": name,
+            "start": round(start - self.origin, 4),
+            "duration": round(duration, 4),
+            **labels
+        })
+
+
+def record_span(name, start, duration, **labels):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, start, duration, **labels)
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time a block into scout_stage_seconds and, if the request is traced, its trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stage_seconds.observe(duration, stage=stage)
+        record_span(stage, start, duration, **labels)
+
+
+def record_llm_call(purpose, duration, messages, response):
+    llm_seconds.observe(duration, purpose=purpose)
+    usage = getattr(response, "usage_metadata", None) or {}
+    # Fall back to a chars/4 estimate when the provider doesn't report usage
+    input_tokens = usage.get("input_tokens") or sum(len(str(message.content)) for message in messages) // 4
+    output_tokens = usage.get("output_tokens") or len(str(getattr(response, "content", ""))) // 4
+    llm_tokens.inc(input_tokens, purpose=purpose, direction="input")
+    llm_tokens.inc(output_tokens, purpose=purpose, direction="output")
+
+
+def start_trace():
+    trace = Trace()
+    current_trace.set(trace)
+    return trace
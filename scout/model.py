@@ -1,14 +1,16 @@
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from langchain_litellm import ChatLiteLLM
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langchain_core.messages import SystemMessage
+from llm_scheduler import LLMScheduler
+from mcp_client import MCPClientManager
+from metrics import span
+from singleflight import SingleFlight
 import asyncio
 import os
+import sys
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 
-model_name = os.getenv("LLM_MODEL")
+# LLM_MODEL is the documented setting; MODEL_NAME is still read for older .env files
+model_name = os.getenv("LLM_MODEL") or os.getenv("MODEL_NAME")
 if os.getenv("LLM_API_KEY") is not None:
     if os.getenv("LLM_PROVIDER") == "openai":
         os.environ["OPENAI_API_KEY"] = os.getenv("LLM_API_KEY")
@@ -21,37 +23,46 @@ if os.getenv("LLM_API_KEY") is not None:
     elif os.getenv("LLM_PROVIDER") == "groq":
         os.environ["GROQ_API_KEY"] = os.getenv("LLM_API_KEY")
 
-    model = ChatLiteLLM(model=os.getenv("MODEL_NAME"))
-else:
-    raise ValueError("LLM_API_KEY is not set")
+_model = None
+_model_lock = threading.Lock()
 
-server_params = StdioServerParameters(
-    command="python",
-    args=["./mcp_servers/scout_server.py"],
-)
+def get_model():
+    """The shared chat model, built on first use because importing litellm takes seconds."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            if os.getenv("LLM_API_KEY") is None:
+                raise ValueError("LLM_API_KEY is not set")
+            from langchain_litellm import ChatLiteLLM
+            _model = ChatLiteLLM(model=model_name)
+        return _model
+
+# Arguments for mcp.StdioServerParameters, which is only imported once a session starts
+server_params = {
+    "command": sys.executable,
+    "args": [os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers", "scout_server.py")],
+    # The server runs the real pipeline, so it needs the same LLM and cache settings as the app
+    "env": dict(os.environ),
+}
+
+# Shared by routing and summarisation so the provider's limits apply to the whole process
+llm_scheduler = LLMScheduler()
+mcp_client = MCPClientManager(get_model, server_params, scheduler=llm_scheduler)
+routing_flight = SingleFlight()
 
 async def get_llm_response(messages):
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            tools = await load_mcp_tools(session)
-            llm = model.bind_tools(tools)
-            messages.insert(0, SystemMessage(content="You are a helpful assistant that can find scientific papers and summarise them."))
-            response = await llm.ainvoke(messages)
-            
-            tool = None
-            if response.tool_calls:
-                tool_call = response.tool_calls[0]
-                print(f"Tool call: {tool_call['name']} with args: {tool_call['args']}")
-                selected_tool = {"find_papers_and_summarise": tools[0]}[tool_call["name"].lower()]
-                tool_msg = await selected_tool.ainvoke(tool_call)
-                tool = {
-                    "name": tool_call["name"],
-                    "args": tool_call["args"]
-                }
-                return response.content, tool
-            
-            return response.content, None
+    # Identical conversations arriving together share one routing call
+    key = tuple((message.type, " ".join(str(message.content).lower().split())) for message in messages)
+    with span("routing"):
+        return await routing_flight.do(key, mcp_client.get_llm_response, messages)
 
 if __name__ == "__main__":
-    print(asyncio.run(get_llm_response()))
\ No newline at end of file
+    from langchain_core.messages import HumanMessage
+
+    async def main():
+        try:
+            print(await get_llm_response([HumanMessage(content="Find papers about quantum computing")]))
+        finally:
+            await mcp_client.close()
+
+    asyncio.run(main())
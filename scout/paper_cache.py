@@ -0,0 +1,117 @@
+import os
+import re
+import time
+import threading
+
+
+def arxiv_id(entry_id):
+    """Canonical arXiv ID with version, e.g. 'http://arxiv.org/abs/2101.00001v2' -> '2101.00001v2'."""
+    match = re.search(r"arxiv\.org/abs/(.+?)/?$", entry_id)
+    return match.group(1) if match else entry_id
+
+
+def split_version(paper_id):
+    """Split an arXiv ID into the paper and its version, e.g. '2101.00001v2' -> ('2101.00001', 2)."""
+    match = re.match(r"^(.+?)(?:v(\d+))?$", paper_id)
+    return match.group(1), int(match.group(2) or 0)
+
+
+class PaperCache:
+    """On-disk cache of downloaded PDFs and their extracted text, keyed by arXiv ID and version.
+
+    Entries are evicted oldest-first once the cache grows past ``max_bytes`` and are
+    dropped on access once they are older than ``max_age`` seconds.
+    """
+
+    def __init__(self, cache_dir="./paper_cache", max_bytes=None, max_age=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("PAPER_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+        self.max_age = max_age if max_age is not None else float(os.getenv("PAPER_CACHE_MAX_AGE", 30 * 24 * 3600))
+        self._lock = threading.Lock()
+        self._created = False
+
+    def _key(self, paper_id):
+        # Old-style IDs such as 'hep-th/9901001v1' contain a slash
+        return re.sub(r"[^A-Za-z0-9._-]", "_", paper_id)
+
+    def _path(self, paper_id, extension):
+        if not self._created:
+            # Created on first use so importing the app doesn't touch the disk
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._created = True
+        return os.path.join(self.cache_dir, f"{self._key(paper_id)}.{extension}")
+
+    def pdf_path(self, paper_id):
+        return self._path(paper_id, "pdf")
+
+    def text_path(self, paper_id):
+        return self._path(paper_id, "txt")
+
+    def _expired(self, path):
+        return time.time() - os.path.getmtime(path) > self.max_age
+
+    def get_text(self, paper_id):
+        path = self.text_path(paper_id)
+        try:
+            if self._expired(path):
+                self.remove(paper_id)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            # Refresh the timestamp so eviction is least-recently-used
+            os.utime(path)
+            return text
+        except FileNotFoundError:
+            return None
+
+    def has_pdf(self, paper_id):
+        path = self.pdf_path(paper_id)
+        return os.path.exists(path) and not self._expired(path)
+
+    def put_text(self, paper_id, text):
+        path = self.text_path(paper_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def remove(self, paper_id):
+        for path in (self.pdf_path(paper_id), self.text_path(paper_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        # Lists and stats the whole cache directory; skip if a pass is already running, the next write catches up
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            entries = []
+            total = 0
+            now = time.time()
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith((".pdf", ".txt")):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    os.remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            while total > self.max_bytes and entries:
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        finally:
+            self._lock.release()
@@ -0,0 +1,150 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from metrics import parse_page_seconds, span
+
+
+def extract_pages(path, start, stop):
+    """Extract the text of pages [start, stop) with a single PdfReader.
+
+    Returns the document's total page count alongside the page texts (and the
+    time each page took) so the caller never has to open the PDF in its own process.
+    """
+    # Imported here so only the parse workers load PyPDF2
+    from PyPDF2 import PdfReader
+    try:
+        reader = PdfReader(path)
+    except Exception as e:
+        return 0, [f"[Error opening PDF]: {str(e)}"], []
+
+    total_pages = len(reader.pages)
+    texts = []
+    durations = []
+    for page_number in range(start, min(stop, total_pages)):
+        page_start = time.perf_counter()
+        try:
+            texts.append(reader.pages[page_number].extract_text() or "")
+        except Exception as e:
+            texts.append(f"[Error on page {page_number + 1}]: {str(e)}")
+        durations.append(time.perf_counter() - page_start)
+    return total_pages, texts, durations
+
+
+def warm_worker():
+    import PyPDF2
+    return os.getpid()
+
+
+class PdfParser:
+    """Long-lived process pool that extracts PDF text in page batches.
+
+    Each task covers a contiguous page range, so a worker opens a given document
+    once per batch rather than once per page. Workers come from a fork server:
+    the pool can be (re)started while the app has threads running, and forking
+    a threaded process can deadlock the child.
+    """
+
+    def __init__(self, max_workers=None, batch_pages=None, max_pages=None, timeout=None):
+        self.max_workers = max_workers or int(os.getenv("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+        self.batch_pages = batch_pages or int(os.getenv("PDF_PARSE_BATCH_PAGES", 8))
+        self.max_pages = max_pages or int(os.getenv("PDF_PARSE_MAX_PAGES", 60))
+        self.timeout = timeout or float(os.getenv("PDF_PARSE_TIMEOUT", 60))
+        self.executor = None
+        self.warmed = False
+
+    @property
+    def ready(self):
+        # A pool replaced after a crash starts its workers on the next parse, so it doesn't need warming again
+        return self.warmed and self.executor is not None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("forkserver"))
+
+    async def warm(self):
+        """Start the workers and load PyPDF2 in them, so the first parse pays for neither."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.executor, warm_worker) for _ in range(self.max_workers)])
+        self.warmed = True
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _recycle(self):
+        """Replace the pool, killing its workers so a batch still running in one can't hold it.
+
+        Other documents' batches on the old pool then fail with BrokenProcessPool,
+        and their parses start again on the new pool.
+        """
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            # ProcessPoolExecutor has no public way to stop a task that is already running
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False)
+        self.start()
+
+    def _batches(self, start, stop):
+        # Spread the remaining pages over the pool, but never below batch_pages per task
+        size = max(self.batch_pages, -(-(stop - start) // self.max_workers))
+        return [(i, min(i + size, stop)) for i in range(start, stop, size)]
+
+    async def _parse(self, executor, path):
+        loop = asyncio.get_running_loop()
+
+        # The first batch also tells us how many pages there are
+        total_pages, first, durations = await loop.run_in_executor(
+            executor, extract_pages, path, 0, min(self.batch_pages, self.max_pages)
+        )
+        if total_pages == 0:
+            return first[0] if first else "[Error]: PDF has no pages"
+
+        stop = min(total_pages, self.max_pages)
+        futures = [
+            loop.run_in_executor(executor, extract_pages, path, batch_start, batch_stop)
+            for batch_start, batch_stop in self._batches(len(first), stop)
+        ]
+        results = await asyncio.gather(*futures)
+
+        texts = first + [text for _, batch, _ in results for text in batch]
+        for duration in durations + [duration for _, _, batch in results for duration in batch]:
+            parse_page_seconds.observe(duration)
+
+        # Filter out error messages and join valid text
+        valid_texts = [text for text in texts if not text.startswith("[Error")]
+        if not valid_texts:
+            return "[Error]: Could not extract any text from the PDF"
+
+        return "\n\n".join(valid_texts)
+
+    async def parse(self, path):
+        self.start()
+        with span("parse"):
+            for attempt in range(2):
+                executor = self.executor
+                try:
+                    return await asyncio.wait_for(self._parse(executor, path), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    # Giving up doesn't stop the batch in its worker; without a new pool a few
+                    # pathological PDFs would occupy every worker and time out everything after them
+                    if self.executor is executor:
+                        self._recycle()
+                    return f"[Error parsing PDF]: timed out after {self.timeout:.0f}s"
+                except (BrokenProcessPool, asyncio.CancelledError) as e:
+                    # Cancelled from outside, rather than a batch lost with the pool
+                    cancelled = asyncio.current_task().cancelling() > 0
+                    if self.executor not in (executor, None) and attempt == 0 and not cancelled:
+                        # Another parse replaced the pool under this one; try again on the new pool
+                        continue
+                    if isinstance(e, asyncio.CancelledError) and cancelled:
+                        raise
+                    # A worker died (e.g. OOM on a pathological PDF); replace the pool
+                    if self.executor is executor:
+                        self._recycle()
+                    return "[Error parsing PDF]: parser worker crashed"
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import re
+from metrics import routing_decisions
+from ttl_cache import TTLCache
+
+SEARCH_TOOL = "find_papers_and_summarise"
+
+# "find recent papers on X", "papers about X", "research regarding X", ...
+PAPERS_ON = re.compile(
+    r"^(?:please\s+)?(?:(?:can|could|would) you\s+)?"
+    r"(?:(?:find|search(?: for)?|look(?: for| up)?|get|show(?: me)?|give me|fetch|list|summari[sz]e)\s+)?(?:me\s+)?"
+    r"(?:some\s+|the\s+|a few\s+|any\s+)?(?:(?:latest|recent|new|top|relevant|key)\s+)*"
+    r"(?:papers?|research|articles?|publications?|work|studies|literature|preprints?)\s+"
+    r"(?:on|about|regarding|related to|in|into|for|covering|discussing|of)\s+(?P<query>.+)$",
+    re.IGNORECASE
+)
+# "find X", "search for X", "look up X", but not "find out ..."
+SEARCH_VERB = re.compile(r"^(?:please\s+)?(?:find(?!\s+out\b)|search(?: for)?|look up|look for)\s+(?P<query>.+)$", re.IGNORECASE)
+SUFFIX = re.compile(r"\s+(?:on|from|in)\s+arxiv$|\s+please$", re.IGNORECASE)
+CHAT = re.compile(
+    r"^(?:hi|hello|hey|thanks|thank you|ok|okay|bye|good (?:morning|afternoon|evening)|how are you|who are you"
+    r"|what (?:can|do) you do|what are you|help)\b",
+    re.IGNORECASE
+)
+QUESTION = re.compile(r"^(?:what|why|how|who|when|where|which|explain|is|are|do|does|can|could|should|would|tell)\b", re.IGNORECASE)
+PERSONAL = re.compile(r"\b(?:i|me|my|you|your|we|our|us)\b", re.IGNORECASE)
+
+
+def normalize(message):
+    return " ".join(message.lower().split())
+
+
+class Router:
+    """Decides whether a message is a paper search, skipping the LLM routing call when that is obvious.
+
+    A cheap heuristic scores each message. Confident searches go straight to
+    the search tool, and everything else falls back to the LLM, whose decisions
+    are cached by normalised message. In between, the search the heuristic
+    would run can be started speculatively alongside the LLM call and is only
+    used if the LLM picks the same query. A discarded search still costs an
+    arXiv rate-limit slot, so ``can_search`` can veto speculating on searches
+    that would have to queue for one.
+    """
+
+    def __init__(self, llm_route, min_confidence=None, speculate_confidence=None, cache_size=None, cache_ttl=None):
+        self.llm_route = llm_route
+        self.min_confidence = min_confidence or float(os.getenv("ROUTER_MIN_CONFIDENCE", 0.85))
+        # Set above 1 to disable speculative searches
+        self.speculate_confidence = speculate_confidence or float(os.getenv("ROUTER_SPECULATE_CONFIDENCE", 0.5))
+        self.cache = TTLCache(
+            maxsize=cache_size or int(os.getenv("ROUTER_CACHE_SIZE", 1024)),
+            ttl=cache_ttl or float(os.getenv("ROUTER_CACHE_TTL", 3600))
+        )
+
+    def classify(self, message):
+        """Return ``(confidence, query)``: how sure we are that the message is a search, and for what."""
+        text = " ".join(message.split()).strip(" ?.!")
+        if not text or CHAT.match(text):
+            return 0.0, None
+
+        personal = PERSONAL.search(text)
+        # "find ..." is only a search when it isn't about the user, e.g. "find why my build fails"
+        match = PAPERS_ON.match(text) or (None if personal else SEARCH_VERB.match(text))
+        if match:
+            query = SUFFIX.sub("", match.group("query")).strip(" ?.!\"'")
+            if query and not PERSONAL.search(query):
+                return (0.95 if match.re is PAPERS_ON else 0.9), query
+
+        if "?" in message or QUESTION.match(text):
+            # Often a search in disguise, but the LLM has to pull the topic out
+            return 0.4, None
+        if personal:
+            return 0.3, None
+
+        # A bare topic such as "graph neural networks for drug discovery", or an
+        # instruction such as "write a haiku"; never enough on its own to skip the LLM
+        words = len(text.split())
+        return (0.7 if words <= 8 else 0.5), SUFFIX.sub("", text)
+
+    async def route(self, messages, search=None, can_search=None):
+        """Route a conversation like ``get_llm_response``.
+
+        Returns ``(response, tool, prefetched)``, where ``prefetched`` is a task
+        already running ``search(query)`` for the tool's query, or None.
+        ``can_search(query)`` says whether that search is cheap enough to start
+        speculatively.
+        """
+        if len(messages) != 1:
+            # Follow-ups depend on the whole conversation
+            routing_decisions.inc(path="llm")
+            response, tool = await self.llm_route(messages)
+            return response, tool, None
+
+        message = str(messages[0].content)
+        key = normalize(message)
+        cached = self.cache.get(key)
+        if cached is not None:
+            routing_decisions.inc(path="cache")
+            return cached[0], cached[1], None
+
+        confidence, query = self.classify(message)
+        if query and confidence >= self.min_confidence:
+            routing_decisions.inc(path="heuristic")
+            return "", {"name": SEARCH_TOOL, "args": {"query": query}}, None
+
+        prefetched = None
+        if search is not None and query and confidence >= self.speculate_confidence:
+            if can_search is None or can_search(query):
+                prefetched = asyncio.create_task(search(query))
+            else:
+                routing_decisions.inc(path="speculation_skipped")
+
+        routing_decisions.inc(path="llm")
+        try:
+            response, tool = await self.llm_route(messages)
+        except BaseException:
+            if prefetched is not None:
+                prefetched.cancel()
+            raise
+        self.cache.set(key, (response, tool))
+
+        if prefetched is not None:
+            if tool is not None and normalize(str(tool["args"].get("query", ""))) == normalize(query):
+                routing_decisions.inc(path="speculation_used")
+            else:
+                routing_decisions.inc(path="speculation_discarded")
+                prefetched.cancel()
+                prefetched = None
+        return response, tool, prefetched
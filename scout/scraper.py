@@ -1,75 +1,237 @@
-import arxiv
 import asyncio
-from uuid import uuid4
-from PyPDF2 import PdfReader
-from concurrent.futures import ProcessPoolExecutor
+import logging
 import os
-import aiohttp
-import tempfile
+import time
+from dedup import latest_versions
+from downloader import DownloadManager, DownloadError
+from local_index import LocalIndex
+from metrics import cache_requests, span
+from paper_cache import PaperCache, arxiv_id
+from pdf_parser import PdfParser
+from singleflight import SingleFlight
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SOURCES = ("arxiv", "local", "hybrid")
 
 
 class PaperScraper:
     def __init__(self):
-        self.client = arxiv.Client()
-        self.cache_dir = "./paper_cache"
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # Created on first search so importing the scraper doesn't pull in the arxiv client
+        self._client = None
+        self.cache_dir = os.getenv("PAPER_CACHE_DIR", "./paper_cache")
+        self.cache = PaperCache(self.cache_dir)
+        self.parser = PdfParser()
+        self.downloader = DownloadManager()
+        self.search_cache = TTLCache(
+            maxsize=int(os.getenv("SEARCH_CACHE_SIZE", 256)),
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", 900))
+        )
+        # arXiv asks for no more than one API request every three seconds
+        self.search_interval = float(os.getenv("ARXIV_MIN_INTERVAL", 3))
+        self._search_lock = asyncio.Lock()
+        self._last_search = 0.0
+        self._search_flight = SingleFlight()
+        self._parse_flight = SingleFlight()
+        # Everything we have searched for or parsed so far, searchable without arXiv
+        self.index = LocalIndex()
+        self.search_source = os.getenv("SEARCH_SOURCE", "arxiv")
+        self.local_min_coverage = float(os.getenv("LOCAL_INDEX_MIN_COVERAGE", 1.0))
+
+    @property
+    def client(self):
+        if self._client is None:
+            import arxiv
+            self._client = arxiv.Client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def start(self):
+        self.parser.start()
+
+    async def close(self):
+        await self.downloader.close()
+        self.parser.shutdown()
+        self.index.close()
+
+    def get_metadata(self, query, n, sort_by=None):
+        return self._to_papers(self._search_papers(query, n, sort_by))
+
+    async def aget_metadata(self, query, n, sort_by=None, source=None):
+        """Find papers for a query.
+
+        ``source`` is "arxiv" (the default, or SEARCH_SOURCE), "local" to answer
+        from the local index only, or "hybrid" to answer locally when the index
+        has enough papers matching every query term and otherwise merge the
+        arXiv results with local matches.
+        """
+        source = source or self.search_source
+        if source not in SEARCH_SOURCES:
+            raise ValueError(f"Unknown search source: {source}")
+        if source == "arxiv":
+            return await self._search_arxiv(query, n, sort_by)
+
+        if source == "hybrid" and not self.index.loaded:
+            # Don't hold the search up while the warm-up is still reading the index
+            cache_requests.inc(cache="local_index", result="miss")
+            return await self._search_arxiv(query, n, sort_by)
+        local = await asyncio.to_thread(self.search_local, query, n)
+        confident = [paper for paper in local if paper["coverage"] >= self.local_min_coverage]
+        cache_requests.inc(cache="local_index", result="hit" if len(confident) >= n else "miss")
+        if source == "local" or len(confident) >= n:
+            return local
+        # Indexing the arXiv results first lets them be re-ranked against everything we already have
+        remote = await self._search_arxiv(query, n, sort_by)
+        return self._merge(remote, await asyncio.to_thread(self.search_local, query, n), n)
+
+    def search_local(self, query, n):
+        with span("local_search"):
+            return latest_versions(self.index.search(query, n))
+
+    def _merge(self, remote, local, n, k=60):
+        # Reciprocal rank fusion of arXiv's ordering and BM25 over the local corpus
+        scores = {}
+        papers = {}
+        for ranking in (remote, local):
+            for rank, paper in enumerate(ranking):
+                scores[paper["id"]] = scores.get(paper["id"], 0.0) + 1 / (k + rank + 1)
+                papers.setdefault(paper["id"], paper)
+        return latest_versions(sorted(papers.values(), key=lambda paper: -scores[paper["id"]]))[:n]
+
+    def _search_key(self, query, n, sort_by):
+        # No sort order means arXiv's submission date, the default of _search_papers
+        return (" ".join(query.lower().split()), n, sort_by.value if sort_by else "submittedDate")
+
+    def search_is_cheap(self, query, n, sort_by=None, source=None):
+        """Whether ``aget_metadata`` can answer without queueing behind arXiv's rate limit.
+
+        True for local searches, searches that are cached or already running,
+        and when no arXiv call is running or due to wait out the interval.
+        """
+        if (source or self.search_source) == "local":
+            return True
+        key = self._search_key(query, n, sort_by)
+        if key in self.search_cache or key in self._search_flight:
+            return True
+        return not self._search_lock.locked() and time.monotonic() >= self._last_search + self.search_interval
+
+    async def _search_arxiv(self, query, n, sort_by):
+        """Search arXiv without blocking the event loop, serving repeat searches from the cache."""
+        key = self._search_key(query, n, sort_by)
+        papers = self.search_cache.get(key)
+        cache_requests.inc(cache="search", result="miss" if papers is None else "hit")
+        if papers is None:
+            # Identical concurrent searches share a single arXiv call
+            papers = await self._search_flight.do(key, self._search_uncached, key, query, n, sort_by)
+        return [dict(paper) for paper in papers]
+
+    async def _search_uncached(self, key, query, n, sort_by):
+        # One search at a time keeps us within arXiv's rate limit across concurrent requests
+        async with self._search_lock:
+            wait = self._last_search + self.search_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                with span("search", query=query):
+                    results = await asyncio.to_thread(self._search_papers, query, n, sort_by)
+            finally:
+                self._last_search = time.monotonic()
+        papers = self._to_papers(results)
+        self.search_cache.set(key, papers)
+        await asyncio.to_thread(self._index_metadata, papers)
+        return papers
+
+    def paper(self, paper_id):
+        """Metadata for a paper we have seen before, or None."""
+        return self.index.get(paper_id)
 
-    def get_metadata(self, query, n):
+    def _index_metadata(self, papers):
+        for paper in papers:
+            try:
+                self.index.add(paper["id"], paper["title"], paper["pdf_url"], abstract=paper["abstract"])
+            except Exception as e:
+                logger.warning(f"Could not index {paper['id']}: {str(e)}")
+
+    def _to_papers(self, results):
         papers = []
-        results = self._search_papers(query, n)
         for result in results:
-            paper_id = str(uuid4())
+            paper_id = arxiv_id(result.entry_id)
             papers.append({
                 "id": paper_id,
                 "title": result.title,
                 "pdf_url": result.pdf_url,
+                "abstract": result.summary,
+                "authors": [author.name for author in result.authors],
+                "categories": result.categories,
                 "result": result
             })
-        return papers
+        # Searches can return more than one version of a paper; only the latest is worth processing
+        return latest_versions(papers)
 
     async def download_and_parse(self, paper):
-        pdf_path = os.path.join(self.cache_dir, f"{paper['id']}.pdf")
+        # Requests that want the same paper at the same time share one download and parse
+        return await self._parse_flight.do(paper["id"], self._download_and_parse, paper)
+
+    async def _download_and_parse(self, paper):
+        # Cache reads and writes touch the disk (and writes may evict), so they run in a thread
+        cached = await asyncio.to_thread(self.cache.get_text, paper["id"])
+        cache_requests.inc(cache="paper_text", result="miss" if cached is None else "hit")
+        if cached is not None:
+            # Backfilling the index can wait for a later hit if the warm-up hasn't loaded it yet
+            if self.index.loaded and not self.index.has_text(paper["id"]):
+                await self._index_text(paper, cached)
+            return {
+                "id": paper["id"],
+                "title": paper["title"],
+                "text": cached
+            }
+
+        pdf_path = self.cache.pdf_path(paper["id"])
 
         try:
-            # Download PDF
-            async with aiohttp.ClientSession() as session:
-                async with session.get(paper["pdf_url"]) as response:
-                    if response.status != 200:
-                        return {
-                            "id": paper["id"],
-                            "title": paper["title"],
-                            "text": f"[Error downloading PDF]: HTTP {response.status}"
-                        }
-                    
-                    with open(pdf_path, 'wb') as f:
-                        f.write(await response.read())
+            # Download PDF, unless an earlier request already left it in the cache
+            if not self.cache.has_pdf(paper["id"]):
+                try:
+                    await self.downloader.download(paper["pdf_url"], pdf_path)
+                except DownloadError as e:
+                    return {
+                        "id": paper["id"],
+                        "title": paper["title"],
+                        "text": f"[Error downloading PDF]: {str(e)}"
+                    }
 
             # Parse PDF
             try:
                 text = await self._parse_pdf(pdf_path)
                 if not text.strip():
+                    self.cache.remove(paper["id"])
                     return {
                         "id": paper["id"],
                         "title": paper["title"],
                         "text": "[Error]: PDF appears to be empty or contains no text"
                     }
+                if text.startswith("[Error"):
+                    # Don't keep a PDF we can't read
+                    self.cache.remove(paper["id"])
+                else:
+                    await asyncio.to_thread(self.cache.put_text, paper["id"], text)
+                    await self._index_text(paper, text)
                 return {
                     "id": paper["id"],
                     "title": paper["title"],
                     "text": text
                 }
             except Exception as e:
+                self.cache.remove(paper["id"])
                 return {
                     "id": paper["id"],
                     "title": paper["title"],
                     "text": f"[Error parsing PDF]: {str(e)}"
                 }
-            finally:
-                # Clean up the PDF file
-                try:
-                    os.remove(pdf_path)
-                except:
-                    pass
 
         except Exception as e:
             return {
@@ -78,61 +240,41 @@ class PaperScraper:
                 "text": f"[Error downloading PDF]: {str(e)}"
             }
     
-    def extract_page_text(self, path, page_number):
+    async def _index_text(self, paper, text):
         try:
-            reader = PdfReader(path)
-            if page_number >= len(reader.pages):
-                return ""
-            page = reader.pages[page_number]
-            return page.extract_text() or ""
+            await asyncio.to_thread(self.index.add, paper["id"], paper["title"], paper["pdf_url"], paper.get("abstract"), text)
         except Exception as e:
-            return f"[Error on page {page_number + 1}]: {str(e)}"
+            # The index is an optimisation; never fail a paper because of it
+            logger.warning(f"Could not index {paper['id']}: {str(e)}")
 
     async def _parse_pdf(self, filepath):
         try:
-            reader = PdfReader(filepath)
-            total_pages = len(reader.pages)
-
-            if total_pages == 0:
-                return "[Error]: PDF has no pages"
-
-            loop = asyncio.get_event_loop()
-            with ProcessPoolExecutor() as executor:
-                tasks = [
-                    loop.run_in_executor(executor, self.extract_page_text, filepath, i)
-                    for i in range(total_pages)
-                ]
-                results = await asyncio.gather(*tasks)
-
-            # Filter out error messages and join valid text
-            valid_texts = [text for text in results if not text.startswith("[Error")]
-            if not valid_texts:
-                return "[Error]: Could not extract any text from the PDF"
-
-            return "\n\n".join(valid_texts)
-
+            return await self.parser.parse(filepath)
         except Exception as e:
             return f"[Error parsing PDF]: {str(e)}"
 
-    def _search_papers(self, query, n):
+    def _search_papers(self, query, n, sort_by=None):
+        import arxiv
         search = arxiv.Search(
             query=query,
             max_results=n,
-            sort_by=arxiv.SortCriterion.SubmittedDate
+            sort_by=sort_by or arxiv.SortCriterion.SubmittedDate
         )
         return list(self.client.results(search))
 
 
 async def main():
     scraper = PaperScraper()
+    scraper.start()
 
-    papers = scraper.get_metadata("quantum computing", 2)
+    papers = await scraper.aget_metadata("quantum computing", 2)
     print("Found papers:")
     for paper in papers:
         print("-", paper["title"])
 
     tasks = [scraper.download_and_parse(paper) for paper in papers]
     results = await asyncio.gather(*tasks)
+    await scraper.close()
 
     print("\nAll done.")
     print(type(results), len(results))
@@ -0,0 +1,54 @@
+import asyncio
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared task.
+
+    Every caller awaits the shared task through ``asyncio.shield``, so a caller
+    being cancelled never cancels the work for the others. The task is only
+    cancelled once the last caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _done(self, key, call, task):
+        self._forget(key, call)
+        # Mark the exception as retrieved in case every waiter has already left
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, fn, *args, **kwargs):
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn(*args, **kwargs)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._done(key, call, task))
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
@@ -1,24 +1,267 @@
-from model import model
+from model import get_model, llm_scheduler, model_name
+from dedup import DedupIndex
 from langchain_core.messages import HumanMessage, SystemMessage
+from metrics import cache_requests, record_llm_call, span
+from singleflight import SingleFlight
+from summary_store import SummaryStore, prompt_hash
+from ttl_cache import TTLCache
 import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Lines that look like section headings: "3 Method", "4.2 Results", "Abstract", "References", ...
+SECTION_HEADING = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?\s+[A-Z][^\n]{0,80}"
+    r"|(?:Abstract|Introduction|Related Work|Background|Methods?|Methodology|Experiments?|Results"
+    r"|Evaluation|Discussion|Conclusions?|References|Acknowledge?ments?|Appendix)\b[^\n]{0,60})$",
+    re.MULTILINE
+)
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose; good enough for budgeting
+    return len(text) // 4 + 1
+
+def split_sections(text, budget):
+    """Split text into chunks of at most ``budget`` estimated tokens, preferring section boundaries."""
+    starts = [0] + [match.start() for match in SECTION_HEADING.finditer(text) if match.start() > 0]
+    sections = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+    pieces = []
+    for section in sections:
+        if estimate_tokens(section) <= budget:
+            pieces.append(section)
+            continue
+        # Oversized section: fall back to paragraphs, then to hard character cuts
+        max_chars = (budget - 1) * 4
+        for paragraph in section.split("\n\n"):
+            pieces.extend(paragraph[i:i + max_chars] for i in range(0, len(paragraph), max_chars))
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and estimate_tokens(current) + estimate_tokens(piece) > budget:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
 
 class Summariser:
-    def __init__(self):
-        self.model = model
+    def __init__(self, model=None):
+        # Built on first use, see model.get_model
+        self._model = model
+        self.scheduler = llm_scheduler
         self.system_prompt = """You are a helpful assistant that summarises papers. Emphasise the key points and the main contributions of the paper.
                                 Make sure to cover all the sections of the paper. Generate the summary in markdown format. Paper:"""
+        self.chunk_prompt = """You are a helpful assistant that summarises part of a scientific paper. Summarise the key points, methods and results
+                                in this excerpt concisely, keeping any numbers and named contributions. Excerpt:"""
+        self.reduce_prompt = """You are a helpful assistant that summarises papers. Below are summaries of consecutive parts of one paper.
+                                Combine them into a single summary that emphasises the key points and the main contributions of the paper
+                                and covers all of its sections. Generate the summary in markdown format. Partial summaries:"""
+        self.preview_prompt = """You are a helpful assistant that previews papers. In two or three plain sentences, say what problem this paper
+                                tackles, what it proposes and its headline result, for a reader deciding whether to read it. Abstract:"""
+        # Previews are the raw abstract unless PREVIEW_LLM asks for a short LLM summary of it
+        self.preview_llm = os.getenv("PREVIEW_LLM", "").lower() in ("1", "true", "yes")
+        # Papers estimated above this many tokens are summarised chunk by chunk. A 60-page
+        # parse is ~90k tokens, so the default sends the longer half of papers down that path
+        self.single_shot_tokens = int(os.getenv("SUMMARY_SINGLE_SHOT_TOKENS", 24000))
+        self.chunk_tokens = int(os.getenv("SUMMARY_CHUNK_TOKENS", 6000))
+        # Chunk summaries survive a failed run, so a retry only redoes the chunks that are missing
+        self.chunk_cache = TTLCache(maxsize=int(os.getenv("SUMMARY_CHUNK_CACHE_SIZE", 2048)), ttl=24 * 3600)
+        self.store = SummaryStore()
+        # Fingerprints of parsed papers, so a new version or near-identical copy reuses a summary
+        self.dedup = DedupIndex()
+        self._flight = SingleFlight()
+        # Callbacks receiving the text of summaries as it is generated, and what has been generated so far
+        self._listeners = {}
+        self._partial = {}
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    @property
+    def model_name(self):
+        # Known without building the model, so stored summaries can be served before it is loaded
+        if self._model is None:
+            return model_name or ""
+        return getattr(self._model, "model", None) or ""
+
+    @property
+    def prompt_hash(self):
+        return prompt_hash(self.system_prompt, self.chunk_prompt, self.reduce_prompt)
+
+    async def cached_summary(self, paper):
+        """The stored summary for this paper, model and prompts, or None."""
+        # SQLite reads and commits run in a thread so a slow disk doesn't pause every stream
+        summary = await asyncio.to_thread(self.store.get, paper["id"], self.model_name, self.prompt_hash)
+        cache_requests.inc(cache="summary", result="miss" if summary is None else "hit")
+        if summary is None:
+            return None
+        return {"summary": summary, "id": paper["id"], "title": paper["title"]}
+
+    async def preview(self, paper):
+        """A quick abstract-based preview of a paper that needs no download, parsing or full-text summary."""
+        abstract = " ".join((paper.get("abstract") or "").split())
+        preview = {"id": paper["id"], "title": paper["title"], "preview": abstract, "kind": "abstract"}
+        if not self.preview_llm or not abstract:
+            return preview
+
+        preview_hash = prompt_hash(self.preview_prompt)
+        text = await asyncio.to_thread(self.store.get, paper["id"], self.model_name, preview_hash)
+        cache_requests.inc(cache="preview", result="miss" if text is None else "hit")
+        if text is None:
+            try:
+                with span("preview"):
+                    text = await self._invoke(self.preview_prompt, abstract, purpose="preview")
+            except Exception as e:
+                # The abstract is still a useful preview
+                logger.warning(f"Preview summary failed for {paper['id']}: {str(e)}")
+                return preview
+            await asyncio.to_thread(self.store.put, paper["id"], self.model_name, preview_hash, text)
+        return {**preview, "preview": text, "kind": "summary"}
 
-    async def summarise_one(self, paper):
-        response = await self.model.ainvoke([
-            SystemMessage(content=self.system_prompt),
-            HumanMessage(content=paper)
-        ])
-        print('done')
+    async def _invoke(self, prompt, text, purpose="summary"):
+        messages = [
+            SystemMessage(content=prompt),
+            HumanMessage(content=text)
+        ]
+        start = time.perf_counter()
+        response = await self.scheduler.ainvoke(self.model, messages)
+        record_llm_call(purpose, time.perf_counter() - start, messages, response)
         return response.content
 
+    async def _stream(self, prompt, text, on_delta, purpose="summary"):
+        messages = [
+            SystemMessage(content=prompt),
+            HumanMessage(content=text)
+        ]
+        start = time.perf_counter()
+        response = None
+        async for chunk in self.scheduler.astream(self.model, messages):
+            response = chunk if response is None else response + chunk
+            if chunk.content:
+                on_delta(chunk.content)
+        record_llm_call(purpose, time.perf_counter() - start, messages, response)
+        return response.content if response is not None else ""
+
+    async def summarise_chunk(self, chunk):
+        key = hashlib.sha256(f"{self.model_name}\0{self.chunk_prompt}\0{chunk}".encode()).hexdigest()
+        summary = self.chunk_cache.get(key)
+        cache_requests.inc(cache="summary_chunk", result="miss" if summary is None else "hit")
+        if summary is None:
+            summary = await self._invoke(self.chunk_prompt, chunk, purpose="chunk")
+            self.chunk_cache.set(key, summary)
+        return summary
+
+    async def map_reduce(self, paper, on_delta=None):
+        chunks = split_sections(paper, self.chunk_tokens)
+        partials = await asyncio.gather(*[self.summarise_chunk(chunk) for chunk in chunks])
+        combined = "\n\n".join(f"## Part {i}\n{partial}" for i, partial in enumerate(partials, 1))
+        if on_delta is not None:
+            # Only the final summary is worth showing as it is written
+            return await self._stream(self.reduce_prompt, combined, on_delta, purpose="reduce")
+        return await self._invoke(self.reduce_prompt, combined, purpose="reduce")
+
+    async def summarise_one(self, paper, on_delta=None):
+        """Summarise a paper's text, passing the summary to ``on_delta`` piece by piece as it is generated."""
+        with span("summarise"):
+            if estimate_tokens(paper) > self.single_shot_tokens:
+                summary = await self.map_reduce(paper, on_delta)
+            elif on_delta is not None:
+                summary = await self._stream(self.system_prompt, paper, on_delta)
+            else:
+                summary = await self._invoke(self.system_prompt, paper)
+        return summary
+
+    async def summarise_paper(self, paper, lookup=True, on_delta=None):
+        """Summarise a parsed paper. ``on_delta`` receives the summary text as it is generated."""
+        # Callers that already checked the store pass lookup=False
+        cached = await self.cached_summary(paper) if lookup else None
+        if cached is not None:
+            return cached
+        key = (paper["id"], self.model_name, self.prompt_hash)
+
+        duplicate = await self.find_duplicate(paper)
+        if duplicate is not None:
+            original = (duplicate["duplicate_of"], self.model_name, self.prompt_hash)
+            summary = await asyncio.to_thread(self.store.get, *original)
+            if summary is not None:
+                await asyncio.to_thread(self.store.put, *key, summary)
+                return {"summary": summary, "id": paper["id"], "title": paper["title"], **duplicate}
+            if original in self._flight:
+                # The original is being summarised right now; share its summary
+                result = await self._summarise_shared(original, paper, on_delta)
+                await asyncio.to_thread(self.store.put, *key, result["summary"])
+                return {**result, "id": paper["id"], "title": paper["title"], **duplicate}
+
+        return await self._summarise_shared(key, paper, on_delta)
+
+    async def find_duplicate(self, paper):
+        """``{"duplicate_of", "similarity"}`` when a paper parsed earlier has the same text, else None."""
+        if paper["text"].startswith("[Error"):
+            return None
+        try:
+            with span("dedup"):
+                duplicate = await asyncio.to_thread(self.dedup.check, paper["id"], paper["text"])
+        except Exception as e:
+            logger.warning(f"Duplicate check failed for {paper['id']}: {str(e)}")
+            return None
+        cache_requests.inc(cache="dedup", result="miss" if duplicate is None else "hit")
+        return duplicate
+
+    async def _summarise_shared(self, key, paper, on_delta):
+        if on_delta is None:
+            return await self._flight.do(key, self._summarise_uncached, key, paper)
+
+        # Joining a summary that is already being written: catch up on what it has so far
+        self._listeners.setdefault(key, []).append(on_delta)
+        if self._partial.get(key):
+            on_delta(self._partial[key])
+        try:
+            return await self._flight.do(key, self._summarise_uncached, key, paper)
+        finally:
+            self._listeners[key].remove(on_delta)
+            if not self._listeners[key]:
+                del self._listeners[key]
+
+    def _broadcast(self, key, text):
+        self._partial[key] = self._partial.get(key, "") + text
+        for on_delta in self._listeners.get(key, ()):
+            on_delta(text)
+
+    async def _summarise_uncached(self, key, paper):
+        on_delta = (lambda text: self._broadcast(key, text)) if key in self._listeners else None
+        try:
+            summary = await self.summarise_one(paper["text"], on_delta)
+        finally:
+            self._partial.pop(key, None)
+        # Download/parse failures are summarised too, but they shouldn't stick
+        if not paper["text"].startswith("[Error"):
+            await asyncio.to_thread(self.store.put, paper["id"], self.model_name, self.prompt_hash, summary)
+        return {"summary": summary, "id": paper["id"], "title": paper["title"]}
+
+    def invalidate(self, paper_id=None, model=None):
+        """Drop stored summaries like ``SummaryStore.invalidate``, including copies made for the paper's duplicates."""
+        if paper_id is None:
+            return self.store.invalidate(model=model)
+        return sum(self.store.invalidate(paper_id=related, model=model)
+                   for related in [paper_id, *self.dedup.duplicates_of(paper_id)])
+
     async def summarise(self, papers):
-        tasks = [self.summarise_one(paper["text"]) for paper in papers]
-        return [{"summary": summary, "id": paper["id"], "title": paper["title"]} for summary, paper in zip(await asyncio.gather(*tasks), papers)]
+        return list(await asyncio.gather(*[self.summarise_paper(paper) for paper in papers]))
 
 if __name__ == "__main__":
-    print(asyncio.run(Summariser().summarise(['paper1', 'paper2'])))
\ No newline at end of file
+    print(asyncio.run(Summariser().summarise(['paper1', 'paper2'])))
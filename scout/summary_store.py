@@ -0,0 +1,120 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def prompt_hash(*prompts):
+    return hashlib.sha256("\0".join(prompts).encode()).hexdigest()[:16]
+
+
+class SummaryStore:
+    """Finished paper summaries keyed by (paper id, model, prompt hash).
+
+    An in-memory LRU sits in front of a SQLite table so hot papers never touch
+    the disk and everything survives a restart.
+    """
+
+    def __init__(self, path=None, maxsize=None):
+        self.path = path or os.getenv("SUMMARY_STORE_PATH", "./summaries.db")
+        self.maxsize = maxsize or int(os.getenv("SUMMARY_MEMORY_CACHE_SIZE", 512))
+        self.memory = OrderedDict()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        # Opened on first use so importing the app doesn't touch the disk
+        with self._open_lock:
+            if self._connection is None:
+                self._connection = self._open()
+            return self._connection
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                paper_id TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (paper_id, model, prompt_hash)
+            )
+        """)
+        conn.commit()
+        return conn
+
+    def _remember(self, key, summary):
+        self.memory[key] = summary
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def get(self, paper_id, model, prompt_hash):
+        key = (paper_id, model, prompt_hash)
+        with self._lock:
+            summary = self.memory.get(key)
+            if summary is not None:
+                self.memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return summary
+
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE paper_id = ? AND model = ? AND prompt_hash = ?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits["disk"] += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, paper_id, model, prompt_hash, summary):
+        key = (paper_id, model, prompt_hash)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)", (*key, summary, time.time())
+            )
+            self._conn.commit()
+            self._remember(key, summary)
+
+    def invalidate(self, paper_id=None, model=None):
+        """Drop stored summaries for a paper and/or model; with no arguments, drop everything."""
+        clauses, params = [], []
+        if paper_id is not None:
+            clauses.append("paper_id = ?")
+            params.append(paper_id)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            deleted = self._conn.execute(f"DELETE FROM summaries{where}", params).rowcount
+            self._conn.commit()
+            for key in list(self.memory):
+                if (paper_id is None or key[0] == paper_id) and (model is None or key[1] == model):
+                    del self.memory[key]
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {
+            "stored": stored,
+            "in_memory": len(self.memory),
+            "hits": dict(self.hits),
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._open_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
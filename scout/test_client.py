@@ -6,21 +6,24 @@ def test_request():
     message = "Find papers about large language models"
     n = 3  # Number of papers to fetch
     
-    # Make the request
+    # Make the request; /stream takes a JSON body and answers with one JSON object per line
     response = requests.post(
         "http://localhost:8000/stream",
-        params={"message": message, "n": n}
+        json={"message": message, "max_results": n},
+        stream=True
     )
     
     print(f"Status: {response.status_code}")
     
-    # Parse and print the JSON response
-    try:
-        json_response = response.json()
-        print("\nReceived JSON:")
-        print(json.dumps(json_response, indent=2))
-    except json.JSONDecodeError:
-        print(f"Failed to parse JSON: {response.text}")
+    # Parse and print each JSON event as it arrives
+    for line in response.iter_lines():
+        if not line:
+            continue
+        try:
+            print("\nReceived JSON:")
+            print(json.dumps(json.loads(line), indent=2))
+        except json.JSONDecodeError:
+            print(f"Failed to parse JSON: {line}")
 
 if __name__ == "__main__":
-    test_request() 
\ No newline at end of file
+    test_request()
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_full_queue_is_rejected_with_429():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        granted_at = await admission.acquire()
+        queued = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        admission.release(granted_at)
+        await queued
+        return rejected.value, admission.in_flight
+
+    rejected, in_flight = asyncio.run(main())
+    assert rejected.status_code == 429
+    assert rejected.reason == "queue_full"
+    assert rejected.retry_after >= 1
+    assert in_flight == 1
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+        await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        return rejected.value, admission.queued, admission.in_flight
+
+    rejected, queued, in_flight = asyncio.run(main())
+    assert rejected.status_code == 503
+    assert rejected.reason == "queue_timeout"
+    assert queued == 0
+    assert in_flight == 1
+
+
+def test_released_slot_goes_to_the_next_waiter_before_newcomers():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+        order = []
+
+        async def request(name):
+            granted_at = await admission.acquire()
+            order.append(name)
+            return granted_at
+
+        granted_at = await request("first")
+        waiter = asyncio.create_task(request("waiter"))
+        await asyncio.sleep(0)
+        admission.release(granted_at)
+        newcomer = asyncio.create_task(request("newcomer"))
+        admission.release(await waiter)
+        admission.release(await newcomer)
+        return order, admission.in_flight
+
+    order, in_flight = asyncio.run(main())
+    assert order == ["first", "waiter", "newcomer"]
+    assert in_flight == 0
+
+
+def test_slot_granted_as_its_waiter_is_cancelled_is_not_lost():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+        granted_at = await admission.acquire()
+        cancelled = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        nxt = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed to the first waiter, which is cancelled before it runs
+        admission.release(granted_at)
+        cancelled.cancel()
+        result, = await asyncio.gather(cancelled, return_exceptions=True)
+        if not isinstance(result, BaseException):
+            # Before Python 3.12, wait_for returns a result that arrives together with the cancellation
+            admission.release(result)
+        await asyncio.wait_for(nxt, timeout=1)
+        return admission.in_flight, admission.queued
+
+    in_flight, queued = asyncio.run(main())
+    assert in_flight == 1
+    assert queued == 0
@@ -0,0 +1,58 @@
+import random
+import pytest
+from dedup import DedupIndex, latest_versions
+
+VOCABULARY = [f"w{i}" for i in range(5000)]
+
+
+def document(rng, words=8000):
+    return [rng.choice(VOCABULARY) for _ in range(words)]
+
+
+@pytest.fixture
+def texts():
+    rng = random.Random(1)
+    original = document(rng)
+    revised = list(original)
+    # About 2% of the words edited, as between two versions of a paper
+    for i in rng.sample(range(len(revised)), 150):
+        revised[i] = rng.choice(VOCABULARY)
+    return {"original": " ".join(original), "revised": " ".join(revised), "unrelated": " ".join(document(rng))}
+
+
+def test_latest_versions_keeps_the_newest_in_the_first_position():
+    papers = [{"id": "1v1"}, {"id": "2"}, {"id": "1v3"}, {"id": "1v2"}, {"id": "hep-th/9901001v1"}]
+    assert [paper["id"] for paper in latest_versions(papers)] == ["1v3", "2", "hep-th/9901001v1"]
+
+
+def test_new_versions_and_copies_are_duplicates(tmp_path, texts):
+    index = DedupIndex(str(tmp_path / "dedup.db"))
+    assert index.check("2401.00001v1", texts["original"]) is None
+    assert index.check("2401.00002v1", texts["unrelated"]) is None
+    version = index.check("2401.00001v2", texts["revised"])
+    assert version["duplicate_of"] == "2401.00001v1"
+    assert version["similarity"] >= index.threshold
+    # A cross-listed copy under another ID is caught through the LSH buckets
+    assert index.check("2402.99999v1", texts["original"])["duplicate_of"] == "2401.00001v1"
+    assert sorted(index.duplicates_of("2401.00001v1")) == ["2401.00001v2", "2402.99999v1"]
+
+
+def test_short_texts_are_never_matched(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.db"))
+    assert index.check("a", "[Error downloading PDF]: 404") is None
+    assert index.check("b", "[Error downloading PDF]: 404") is None
+    assert index.stats()["originals"] == 0
+
+
+def test_fingerprints_survive_a_restart(tmp_path, texts):
+    path = str(tmp_path / "dedup.db")
+    index = DedupIndex(path)
+    index.check("2401.00001v1", texts["original"])
+    index.check("2401.00001v2", texts["revised"])
+    index.close()
+
+    reopened = DedupIndex(path)
+    assert not reopened.loaded
+    assert reopened.stats() == {"originals": 1, "duplicates": 1, "threshold": reopened.threshold}
+    assert reopened.check("2401.00001v2", "")["duplicate_of"] == "2401.00001v1"
+    assert reopened.check("2402.99999v1", texts["original"])["duplicate_of"] == "2401.00001v1"
@@ -0,0 +1,43 @@
+import time
+from delta_buffer import DeltaBuffer
+
+
+def test_text_is_coalesced_per_key():
+    buffer = DeltaBuffer(max_chars=100, max_delay=10)
+    buffer.add("a", "Hello")
+    buffer.add("b", "Bonjour")
+    buffer.add("a", " world")
+    assert not buffer.due()
+    assert buffer.flush() == [("a", "Hello world"), ("b", "Bonjour")]
+    assert buffer.flush() == []
+    assert buffer.time_to_flush() is None
+
+
+def test_due_once_a_key_has_max_chars():
+    buffer = DeltaBuffer(max_chars=10, max_delay=10)
+    buffer.add("a", "12345")
+    buffer.add("b", "123456789")
+    assert not buffer.due()
+    buffer.add("a", "67890")
+    assert buffer.due()
+
+
+def test_due_once_the_oldest_text_is_max_delay_old():
+    buffer = DeltaBuffer(max_chars=100, max_delay=0.02)
+    assert not buffer.due()
+    buffer.add("a", "x")
+    assert 0 < buffer.time_to_flush() <= 0.02
+    time.sleep(0.03)
+    assert buffer.time_to_flush() == 0
+    assert buffer.due()
+
+
+def test_discard_drops_a_key_and_resets_the_timer_when_empty():
+    buffer = DeltaBuffer(max_chars=100, max_delay=10)
+    buffer.add("a", "x")
+    buffer.add("b", "y")
+    buffer.discard("a")
+    assert buffer.time_to_flush() is not None
+    buffer.discard("b")
+    assert buffer.time_to_flush() is None
+    assert buffer.flush() == []
@@ -0,0 +1,71 @@
+import asyncio
+from jobs import JobManager, JobStore
+
+
+class FakeScraper:
+    def __init__(self):
+        self.searched = []
+        self.parsed = []
+
+    async def aget_metadata(self, query, n):
+        self.searched.append(query)
+        return [{"id": f"{query}-{i}", "title": f"{query} {i}", "pdf_url": f"http://pdf/{query}-{i}"} for i in range(n)]
+
+    async def download_and_parse(self, paper):
+        self.parsed.append(paper["id"])
+        return {"id": paper["id"], "title": paper["title"], "text": f"text of {paper['id']}"}
+
+
+class FakeSummariser:
+    async def cached_summary(self, paper):
+        return None
+
+    async def summarise_paper(self, paper, lookup=True):
+        return {"id": paper["id"], "title": paper["title"], "summary": f"summary of {paper['id']}"}
+
+
+async def run_until_done(manager, job_id):
+    manager.start()
+    try:
+        while manager.store.job(job_id)["status"] in ("queued", "running"):
+            await asyncio.sleep(0.01)
+    finally:
+        await manager.close()
+
+
+def test_job_summarises_every_paper_found_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    scraper = FakeScraper()
+    manager = JobManager(scraper, FakeSummariser(), store=store, workers=1)
+
+    async def main():
+        job_id = manager.submit(["graphs", "graphs"], 2)
+        await asyncio.wait_for(run_until_done(manager, job_id), timeout=5)
+        return job_id
+
+    job_id = asyncio.run(main())
+    progress = store.progress(job_id)
+    assert progress["status"] == "done"
+    assert progress["papers"] == {"total": 2, "pending": 0, "done": 2, "failed": 0}
+    assert sorted(scraper.parsed) == ["graphs-0", "graphs-1"]
+
+
+def test_interrupted_job_resumes_without_redoing_finished_work(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job_id = store.create(["graphs", "diffusion"], 2)
+    # The previous process searched the first query and finished one of its papers before stopping
+    store.set_status(job_id, "running")
+    store.add_papers(job_id, 0, [{"id": f"graphs-{i}", "title": f"graphs {i}", "pdf_url": "http://pdf"} for i in range(2)])
+    store.set_query_status(job_id, 0, "done")
+    store.finish_paper(job_id, "graphs-0", summary="earlier summary")
+
+    scraper = FakeScraper()
+    manager = JobManager(scraper, FakeSummariser(), store=JobStore(path), workers=1)
+    asyncio.run(asyncio.wait_for(run_until_done(manager, job_id), timeout=5))
+
+    assert scraper.searched == ["diffusion"]
+    assert sorted(scraper.parsed) == ["diffusion-0", "diffusion-1", "graphs-1"]
+    summaries = {paper["paper_id"]: paper["summary"] for paper in manager.store.papers(job_id)}
+    assert summaries["graphs-0"] == "earlier summary"
+    assert manager.store.progress(job_id)["status"] == "done"
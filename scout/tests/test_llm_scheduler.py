@@ -0,0 +1,66 @@
+import asyncio
+from llm_scheduler import LLMScheduler, current_flow
+
+
+def test_slot_granted_as_its_waiter_is_cancelled_is_given_back():
+    async def main():
+        scheduler = LLMScheduler(max_in_flight=1, rpm=0, tpm=0)
+        waiter = None
+
+        async def hold():
+            async with scheduler.slot():
+                await asyncio.sleep(0.01)
+            # Releasing handed the slot to the waiter, which hasn't run yet
+            waiter.cancel()
+
+        async def wait():
+            async with scheduler.slot():
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait())
+        await holder
+        await asyncio.gather(waiter, return_exceptions=True)
+        in_flight = scheduler.in_flight
+
+        async def call():
+            async with scheduler.slot():
+                return "ok"
+
+        return waiter.cancelled(), in_flight, await asyncio.wait_for(call(), timeout=1)
+
+    cancelled, in_flight, result = asyncio.run(main())
+    assert cancelled
+    assert in_flight == 0
+    assert result == "ok"
+
+
+def test_waiting_flows_are_served_round_robin():
+    async def main():
+        scheduler = LLMScheduler(max_in_flight=1, rpm=0, tpm=0)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        async def call(flow, name):
+            current_flow.set(flow)
+            async with scheduler.slot():
+                order.append(name)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        tasks = []
+        for flow, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("b", "b2")]:
+            tasks.append(asyncio.create_task(call(flow, name)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order, scheduler.queued
+
+    order, queued = asyncio.run(main())
+    assert order == ["a1", "b1", "a2", "b2", "a3"]
+    assert queued == 0
@@ -0,0 +1,46 @@
+import pytest
+from local_index import LocalIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalIndex(str(tmp_path / "local_index.db"))
+    index.add("1", "Graph neural networks for drug discovery", "http://pdf/1", abstract="Molecules as graphs.")
+    index.add("2", "Diffusion models for images", "http://pdf/2", abstract="Denoising generative models.")
+    index.add("3", "A survey of neural networks", "http://pdf/3", abstract="Deep learning overview.")
+    yield index
+    index.close()
+
+
+def test_results_are_ranked_and_report_coverage(index):
+    results = index.search("graph neural networks", 5)
+    assert [paper["id"] for paper in results] == ["1", "3"]
+    assert results[0]["coverage"] == 1.0
+    assert results[1]["coverage"] == pytest.approx(2 / 3)
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_search_returns_at_most_n(index):
+    top = index.search("neural models", 1)
+    assert len(top) == 1
+    assert top[0]["id"] == index.search("neural models", 5)[0]["id"]
+    assert index.search("quantum", 5) == []
+    assert index.search("the of", 5) == []
+
+
+def test_full_text_is_indexed_and_replaces_the_metadata_entry(index):
+    assert index.search("transformer", 5) == []
+    index.add("2", "Diffusion models for images", "http://pdf/2", text="We use a transformer backbone.")
+    assert [paper["id"] for paper in index.search("transformer", 5)] == ["2"]
+    assert index.has_text("2")
+    assert index.stats()["documents"] == 3
+    # The abstract is kept when the full text arrives
+    assert index.get("2")["abstract"] == "Denoising generative models."
+
+
+def test_index_survives_a_restart(tmp_path, index):
+    index.close()
+    reopened = LocalIndex(index.path)
+    assert not reopened.loaded
+    assert [paper["id"] for paper in reopened.search("diffusion", 5)] == ["2"]
+    assert reopened.loaded
@@ -0,0 +1,41 @@
+import os
+import time
+from paper_cache import PaperCache, arxiv_id, split_version
+
+
+def test_ids_and_versions():
+    assert arxiv_id("http://arxiv.org/abs/2101.00001v2") == "2101.00001v2"
+    assert split_version("2101.00001v2") == ("2101.00001", 2)
+    assert split_version("hep-th/9901001") == ("hep-th/9901001", 0)
+
+
+def test_text_round_trip_with_old_style_ids(tmp_path):
+    cache = PaperCache(str(tmp_path))
+    cache.put_text("hep-th/9901001v1", "text")
+    assert cache.get_text("hep-th/9901001v1") == "text"
+    assert cache.get_text("hep-th/9901001v2") is None
+    cache.remove("hep-th/9901001v1")
+    assert cache.get_text("hep-th/9901001v1") is None
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    cache = PaperCache(str(tmp_path), max_bytes=10000)
+    for i, paper_id in enumerate(["a", "b", "c"]):
+        cache.put_text(paper_id, "x" * 1000)
+        os.utime(cache.text_path(paper_id), (time.time() - 100 + i, time.time() - 100 + i))
+    # Reading "a" makes it the most recently used
+    assert cache.get_text("a") is not None
+    cache.max_bytes = 2500
+    cache.evict()
+    assert cache.get_text("b") is None
+    assert cache.get_text("a") is not None
+    assert cache.get_text("c") is not None
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = PaperCache(str(tmp_path), max_age=60)
+    cache.put_text("a", "text")
+    old = time.time() - 120
+    os.utime(cache.text_path("a"), (old, old))
+    assert cache.get_text("a") is None
+    assert not os.path.exists(cache.text_path("a"))
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import sys
+import pytest
+from pdf_parser import PdfParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+fakes = pytest.importorskip("fakes")
+
+
+@pytest.fixture(scope="module")
+def pdfs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("pdfs")
+    paths = []
+    for i in range(8):
+        path = directory / f"paper{i}.pdf"
+        path.write_bytes(fakes.make_pdf(f"2401.{i:05d}v1", 20))
+        paths.append(str(path))
+    return paths
+
+
+def test_parses_survive_another_parse_replacing_the_pool(pdfs):
+    async def main():
+        parser = PdfParser(max_workers=2, batch_pages=2, timeout=30)
+        await parser.warm()
+        try:
+            tasks = [asyncio.create_task(parser.parse(path)) for path in pdfs]
+            await asyncio.sleep(0.05)
+            # What a timed-out parse does to every other document's batches
+            parser._recycle()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            parser.shutdown()
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, str) and result.startswith("1 Introduction") for result in results), results
+
+
+def test_timed_out_parse_replaces_the_pool(pdfs):
+    async def main():
+        parser = PdfParser(max_workers=2, timeout=0.001)
+        await parser.warm()
+        try:
+            executor = parser.executor
+            timed_out = await parser.parse(pdfs[0])
+            replaced = parser.executor is not executor
+            parser.timeout = 30
+            return timed_out, replaced, await parser.parse(pdfs[0])
+        finally:
+            parser.shutdown()
+
+    timed_out, replaced, parsed = asyncio.run(main())
+    assert timed_out.startswith("[Error parsing PDF]: timed out")
+    assert replaced
+    assert parsed.startswith("1 Introduction")
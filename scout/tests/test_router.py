@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from router import SEARCH_TOOL, Router
+
+
+@pytest.fixture
+def router():
+    return Router(llm_route=None, min_confidence=0.85, speculate_confidence=0.5)
+
+
+@pytest.mark.parametrize("message, query", [
+    ("papers on graph neural networks", "graph neural networks"),
+    ("Can you find me recent papers about diffusion models?", "diffusion models"),
+    ("find transformers for vision on arXiv", "transformers for vision"),
+])
+def test_explicit_searches_skip_the_llm(router, message, query):
+    confidence, found = router.classify(message)
+    assert confidence >= router.min_confidence
+    assert found == query
+
+
+@pytest.mark.parametrize("message", [
+    "hello",
+    "nice",
+    "write a haiku about autumn",
+    "translate this to french",
+    "find out why my build fails",
+    "find me a dentist",
+    "papers on my thesis topic",
+    "what is attention?",
+])
+def test_everything_else_goes_to_the_llm(router, message):
+    confidence, _ = router.classify(message)
+    assert confidence < router.min_confidence
+
+
+def run_route(router, message, tool_query, can_search):
+    searches = []
+
+    async def llm_route(messages):
+        return "", {"name": SEARCH_TOOL, "args": {"query": tool_query}}
+
+    async def search(query):
+        searches.append(query)
+        return [query]
+
+    async def main():
+        router.llm_route = llm_route
+        return await router.route([SimpleNamespace(content=message)], search=search, can_search=can_search)
+
+    response, tool, prefetched = asyncio.run(main())
+    return tool, prefetched, searches
+
+
+def test_speculative_search_is_kept_when_the_llm_agrees(router):
+    tool, prefetched, searches = run_route(router, "graph neural networks", "graph neural networks", lambda query: True)
+    assert prefetched is not None
+    assert searches == ["graph neural networks"]
+
+
+def test_no_speculation_when_the_search_would_queue(router):
+    tool, prefetched, searches = run_route(router, "graph neural networks", "graph neural networks", lambda query: False)
+    assert tool["args"]["query"] == "graph neural networks"
+    assert prefetched is None
+    assert searches == []
@@ -0,0 +1,71 @@
+import asyncio
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(3)])
+        return results, calls, flight
+
+    results, calls, flight = asyncio.run(main())
+    assert results == ["result"] * 3
+    assert len(calls) == 1
+    assert flight.shared == 2
+    assert "key" not in flight
+
+
+def test_cancelled_subscriber_leaves_others_the_shared_result():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        started = []
+
+        async def fetch():
+            started.append(1)
+            await release.wait()
+            return "result"
+
+        tasks = [asyncio.create_task(flight.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return results, started
+
+    results, started = asyncio.run(main())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["result", "result"]
+    assert len(started) == 1
+
+
+def test_work_is_cancelled_when_every_subscriber_leaves():
+    async def main():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        tasks = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        return flight
+
+    flight = asyncio.run(main())
+    assert len(flight) == 0
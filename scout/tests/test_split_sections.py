@@ -0,0 +1,30 @@
+import pytest
+
+summariser = pytest.importorskip("summariser")
+estimate_tokens = summariser.estimate_tokens
+split_sections = summariser.split_sections
+
+
+def paragraph(words):
+    return " ".join(f"word{i}" for i in range(words))
+
+
+def test_short_text_is_one_chunk():
+    text = "1 Introduction\n" + paragraph(50)
+    assert split_sections(text, 1000) == [text]
+
+
+def test_chunks_break_at_section_headings():
+    sections = [f"{i} Section {i}\n{paragraph(300)}" for i in range(1, 5)]
+    chunks = split_sections("\n".join(sections), 600)
+    assert len(chunks) == 4
+    assert [chunk.split("\n", 1)[0] for chunk in chunks] == ["1 Section 1", "2 Section 2", "3 Section 3", "4 Section 4"]
+
+
+def test_oversized_section_is_cut_within_the_budget():
+    text = "1 Method\n" + "\n\n".join(paragraph(400) for _ in range(6))
+    chunks = split_sections(text, 500)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+    # Nothing but the joins between pieces is lost
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+import pytest
+from summary_store import SummaryStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+
+def test_summaries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "summaries.db")
+    store = SummaryStore(path)
+    store.put("2401.00001v1", "model", "prompt", "summary")
+    store.close()
+    reopened = SummaryStore(path)
+    assert reopened.get("2401.00001v1", "model", "prompt") == "summary"
+    assert reopened.hits["disk"] == 1
+    assert reopened.get("2401.00001v1", "model", "prompt") == "summary"
+    assert reopened.hits["memory"] == 1
+    assert reopened.get("2401.00001v1", "other-model", "prompt") is None
+
+
+def test_invalidate_by_paper_and_model(tmp_path):
+    store = SummaryStore(str(tmp_path / "summaries.db"))
+    for paper_id in ("a", "b"):
+        for model in ("m1", "m2"):
+            store.put(paper_id, model, "prompt", f"{paper_id}-{model}")
+    assert store.invalidate(paper_id="a", model="m1") == 1
+    assert store.get("a", "m1", "prompt") is None
+    assert store.get("a", "m2", "prompt") == "a-m2"
+    assert store.invalidate(model="m2") == 2
+    assert store.invalidate() == 1
+    assert store.stats()["stored"] == 0
+
+
+def test_invalidating_a_paper_drops_its_duplicates_copies(tmp_path):
+    summariser = pytest.importorskip("summariser")
+    fakes = pytest.importorskip("fakes")
+    from dedup import DedupIndex
+
+    async def main():
+        scout = summariser.Summariser(model=fakes.FakeChatModel(latency=0, tokens_per_second=100000, output_tokens=10))
+        scout.store = SummaryStore(str(tmp_path / "summaries.db"))
+        scout.dedup = DedupIndex(str(tmp_path / "dedup.db"))
+        text = " ".join(f"word{i}" for i in range(2000))
+        await scout.summarise_paper({"id": "2401.00001v1", "title": "v1", "text": text})
+        duplicate = await scout.summarise_paper({"id": "2401.00001v2", "title": "v2", "text": text})
+        deleted = await asyncio.to_thread(scout.invalidate, paper_id="2401.00001v1")
+        return duplicate, deleted, scout
+
+    duplicate, deleted, scout = asyncio.run(main())
+    assert duplicate["duplicate_of"] == "2401.00001v1"
+    assert deleted == 2
+    assert scout.store.stats()["stored"] == 0